@@ -16,4 +16,13 @@ export async function fetchMessage(data: { content: string }): Promise<{code: nu
     data
   }) as never
   return resp
+}
+
+export async function fetchMessages(data: { contents: Array<string> }): Promise<{code: number, msg: number, data: Array<Array<{ content: string; time: number }>>}> {
+  const resp = await request({
+    url: '/api/bot/chat/messages',
+    method: 'post',
+    data
+  }) as never
+  return resp
 }
\ No newline at end of file
@@ -28,8 +28,8 @@ export async function fetchDetail(data: { schema: string }): Promise<{
 }> {
   const resp = await request({
     url: '/api/bot/portal/detail',
-    method: 'post',
-    data
+    method: 'get',
+    params: data
   })
   return resp.data
 }
\ No newline at end of file
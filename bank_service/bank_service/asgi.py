@@ -2,6 +2,8 @@
 ASGI config for bank_service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The websocket chat (see bot_service.controller.websocket) is routed here,
+and the others go to django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -13,4 +15,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bank_service.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+import bot_service.apps  # after django is set up
+import bot_service.controller.websocket as websocket
+
+bot_service.apps.start()  # the definitions warmed up and watched by the server only
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == websocket.PATH:
+            return await websocket.chat(scope, receive, send)
+        await receive()  # connect
+        return await send({'type': 'websocket.close'})  # rejected
+    return await django_application(scope, receive, send)
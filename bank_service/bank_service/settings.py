@@ -45,7 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'bot_service.middleware.SessionMiddleware',  # see bot_service/middleware.py
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,10 +70,28 @@ DATABASES = {
 }
 
 
+# 'bot_service.backends.memory' keeps the sessions in the memory of the
+# process instead (for a single worker process), and 'bot_service.backends.shm'
+# in a memory-mapped file shared by the worker processes
 SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
 
 SESSION_COOKIE_AGE = 7200  # expire in 2h
 
+# the in-memory sessions, the least recently used ones are dropped
+SESSION_MEMORY_MAX_ENTRIES = 100000
+SESSION_MEMORY_SWEEP_INTERVAL = 60  # seconds between the sweeps of expired sessions
+
+# the shared-memory sessions, a table of SESSION_SHM_BUCKETS * SESSION_SHM_BUCKET_SIZE
+# slots of 256 bytes (16MB by default)
+SESSION_SHM_PATH = None  # None for /dev/shm/bank_service_sessions (or in the temp dir)
+SESSION_SHM_BUCKETS = 8192
+SESSION_SHM_BUCKET_SIZE = 8  # the oldest session in a full bucket is dropped
+SESSION_SHM_STRIPES = 64  # locks shared by the buckets
+
+# the messages of a session are handled one by one, locked by one of the
+# stripes hashed by the session key
+SESSION_LOCK_STRIPES = 1024
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -132,4 +150,26 @@ if DEBUG:
 
 JWT_PUBLIC_PATH = 'serv_auth/store/public.pem'
 JWT_SECRET_PATH = 'serv_auth/store/private.key'
-JWT_EXPIRE_IN = 7200
\ No newline at end of file
+JWT_EXPIRE_IN = 7200
+
+
+# the pool to run the handlers of script modules ('thread', 'process'
+# or None to run them inline in the request worker)
+SCRIPT_POOL = 'thread'
+SCRIPT_POOL_SIZE = 8
+SCRIPT_QUEUE_SIZE = 64  # calls waiting for a worker, more are rejected
+SCRIPT_TIMEOUT = 5  # seconds, replying the error text when exceeded
+
+# the circuit breaker of each script handler: open after the failures
+# within the window (seconds), replying the last good reply (or the error
+# text), then probe again after the cooldown (seconds)
+SCRIPT_BREAKER_FAILURES = 5  # None to never open
+SCRIPT_BREAKER_WINDOW = 60
+SCRIPT_BREAKER_COOLDOWN = 30
+
+
+# the definitions (file names, or '*' for all) to build at startup,
+# the others are built on first use
+BOT_WARMUP = []
+BOT_BUILD_WORKERS = None  # processes to build the warm-up definitions, None for all the cpus
+BOT_RELOAD_INTERVAL = 5  # seconds between the checks for changed definitions, 0 to disable
\ No newline at end of file
@@ -2,6 +2,7 @@
 WSGI config for bank_service project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+It is also imported by ``manage.py runserver``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
@@ -14,3 +15,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bank_service.settings')
 
 application = get_wsgi_application()
+
+import bot_service.apps  # after django is set up
+
+bot_service.apps.start()  # the definitions warmed up and watched by the server only
@@ -0,0 +1,70 @@
+"""benchmark of the ranked faq retrieval
+
+It ranks a faq of generated questions, chinese and english ones, with
+the stop features (see FaqIndex.STOP_RATIO) and without them, by the
+time of a search and of adding the questions.
+
+Typical usage (in the directory of manage.py):
+python -m benchmark.bench_faq [questions] [queries]
+"""
+import random
+import sys
+import time
+
+from bot_service.service.model.faq import FaqIndex
+
+
+COMMON = ['how', 'do', 'i', 'the', 'a', 'to', 'my', 'what', 'is', 'can', 'of', 'for',
+          'in', 'and', 'with', 'account', 'card', 'bank', 'transfer', 'open']
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+HANZI = [chr(c) for c in range(0x4e00, 0x4e00 + 3000)]
+
+
+def question(rng: random.Random, words: list[str], latin: bool) -> str:
+    """generate a question, english of common and rare words, or chinese
+    """
+    if latin:
+        return ' '.join(rng.choice(COMMON) if rng.random() < 0.5 else rng.choice(words)
+                        for _ in range(rng.randint(5, 12))) + '?'
+    return '如何' + ''.join(rng.choices(HANZI, k=rng.randint(6, 14))) + '？'
+
+
+def measure(questions: list[str], queries: list[str]) -> tuple[float, float, int]:
+    """add the questions after ranking is enabled, then search
+
+    Returns:
+        tuple[float, float, int]: (seconds to add and build, milliseconds
+        per search, number of the searches found)
+    """
+    begin = time.perf_counter()
+    faq = FaqIndex()
+    faq.enable_ranking(3, 0.2)
+    for i, q in enumerate(questions):
+        faq.add(q, str(i))
+    faq.rank('')  # built once here
+    built = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    found = sum([len(faq.rank(q)) > 0 for q in queries])
+    return built, (time.perf_counter() - begin) / len(queries) * 1000, found
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(0)
+    words = [''.join(rng.choices(LETTERS, k=rng.randint(2, 9))) for _ in range(20000)]
+    for name, latin in (('chinese', False), ('english', True)):
+        questions = [question(rng, words, latin) for _ in range(n)]
+        # half of the queries are the beginnings of the questions
+        queries = [question(rng, words, latin) for _ in range(m // 2)] + \
+            [q[:len(q) // 2] for q in rng.sample(questions, m - m // 2)]
+        print(f"{name} ({n} questions):")
+        for label, ratio in (('stop features', FaqIndex.STOP_RATIO), ('all features', 1.0)):
+            saved = FaqIndex.STOP_RATIO
+            FaqIndex.STOP_RATIO = ratio
+            try:
+                built, per_query, found = measure(questions, queries)
+            finally:
+                FaqIndex.STOP_RATIO = saved
+            print(f"  {label}: built in {built:.2f}s, {per_query:.3f}ms per search, {found}/{m} found")
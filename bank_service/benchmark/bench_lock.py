@@ -0,0 +1,68 @@
+"""contention of the session locks under a multi-thread load
+
+Some threads send messages on their own sessions at once (the memory
+session backend), through data.session.message. The striped locks are
+compared with a single lock for all the sessions, by the messages
+handled per second and the share of the acquisitions which waited for
+another holder.
+
+Typical usage (in the directory of manage.py):
+python -m benchmark.bench_lock [threads] [messages]
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+
+def run(threads: int, messages: int) -> tuple[float, float]:
+    """send the messages from the threads
+
+    Returns:
+        tuple[float, float]: (messages per second, contended share)
+    """
+    import bot_service.service.data.session as data
+    import bot_service.service.model.loader as loader
+    from bot_service.backends.memory import SessionStore
+
+    schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+    keys = []
+    for _ in range(threads):
+        session = SessionStore()
+        data.init(session, {'schema': schema})
+        keys.append(session.session_key)
+
+    def chat(key: str) -> None:
+        for _ in range(messages):
+            data.message(SessionStore(key), {'content': 'Bank service'})
+
+    before = data.session_locks.stats()
+    workers = [threading.Thread(target=chat, args=(key, )) for key in keys]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    after = data.session_locks.stats()
+    acquired = after['acquired'] - before['acquired']
+    return (acquired / seconds, (after['contended'] - before['contended']) / acquired)
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bank_service.settings')
+    import django
+    django.setup()
+    logging.getLogger().disabled = True
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    import bot_service.service.data.session as data
+    from bot_service.service.util.lock import StripedLock
+
+    print(f"threads: {threads}, messages: {threads * messages}")
+    for name, stripes in [('single', 1), ('striped', data.session_locks.stripes)]:
+        data.session_locks = StripedLock(stripes)
+        rate, contended = run(threads, messages)
+        print(f"{name:10}{rate:>12.0f}/s{contended:>10.1%} contended")
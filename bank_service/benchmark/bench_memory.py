@@ -0,0 +1,128 @@
+"""memory report of the stat table and node list of a bot model
+
+It builds a synthetic definition with many services, then compares the
+size of the compact layout (slot records with a dispatch dict, lazily
+created faq) with the previous one (a dict per stat with its wait and
+serv dicts, a node with an instance dict and an empty faq dict), both
+holding the same strings, handlers and faq items.
+
+Typical usage (in the directory of manage.py):
+python -m benchmark.bench_memory [services]
+"""
+import logging
+import sys
+
+from bot_service.service.model.bot import BotModel, BotNode, CommandEnum
+
+
+def generate(services: int) -> list:
+    """generate a parsed script with many services
+
+    Args:
+        services (int): number of services
+
+    Returns:
+        list: the script
+    """
+    script = []
+    for i in range(services // 10):
+        subs = []
+        for j in range(9):
+            subs.append(((CommandEnum.Service, f'service {i}-{j}'), [
+                ((CommandEnum.Text, f'text {i}-{j}', f'answer {i}-{j}'), None),
+                ((CommandEnum.Script, f'script {i}-{j}', 'evaluate'), None),
+                ((CommandEnum.ScriptWaiting, f'waiting {i}-{j}', 'tips', 'check'), None)
+            ]))
+        subs.append(((CommandEnum.FAQ, f'faq {i}'), [
+            ((CommandEnum.KVItem, f'question {i}-{k}', f'answer {i}-{k}'), None)
+            for k in range(3)
+        ]))
+        script.append(((CommandEnum.Service, f'service {i}'), subs))
+    return script
+
+
+def sizeof(obj: object, seen: set[int]) -> int:
+    """the size of the containers and records reachable from an object
+
+    Strings, numbers, enums, handlers and faq items are shared by both
+    layouts, so they are not counted.
+    """
+    if id(obj) in seen:
+        return 0
+    if isinstance(obj, dict):
+        seen.add(id(obj))
+        return sys.getsizeof(obj) + sum([sizeof(v, seen) for v in obj.values()])
+    if isinstance(obj, (list, tuple)):
+        seen.add(id(obj))
+        return sys.getsizeof(obj) + sum([sizeof(v, seen) for v in obj])
+    if isinstance(obj, (BotModel.Stat, BotNode, Legacy)):
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if hasattr(obj, '__dict__'):
+            size += sizeof(obj.__dict__, seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if slot.startswith('__'):
+                slot = f'_{type(obj).__name__}{slot}'
+            size += sizeof(getattr(obj, slot, None), seen)
+        return size
+    return 0
+
+
+class Legacy:
+    """a node of the previous layout, attributes in an instance dict
+    """
+
+
+def legacy_layout(bot: BotModel) -> tuple[list[dict], list[Legacy]]:
+    """convert a model to the previous layout
+    """
+    table = bot._BotModel__stat_table
+    stat_table = []
+    for i, stat in enumerate(table):
+        if stat.type == BotModel.StatType.Wait:
+            stat_table.append({
+                'type': stat.type, 'node': stat.node,
+                'token': stat.token, 'cancel': stat.cancel
+            })
+        else:
+            wait, serv = {}, {}
+            for msg, action in stat.dispatch.items():
+                target = table[action[1]]
+                if target.type == BotModel.StatType.Wait:
+                    wait[msg] = action[1]
+                elif target.type == BotModel.StatType.Serv and target.prev == i:
+                    serv[msg] = action[1]
+            record = {'type': stat.type, 'node': stat.node,
+                      'wait': wait, 'serv': serv}
+            if stat.type == BotModel.StatType.Serv:
+                record['prev'] = stat.prev
+            stat_table.append(record)
+
+    node_list = []
+    for node in bot._BotModel__node_list:
+        legacy = Legacy()
+        legacy.query = dict(node._BotNode__query)
+        legacy.faq_keyword = node._BotNode__faq_keyword
+        legacy.faq = node._BotNode__faq or {}  # an empty dict if no faq
+        node_list.append(legacy)
+    return stat_table, node_list
+
+
+if __name__ == '__main__':
+    logging.getLogger().disabled = True
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    bot = BotModel()
+    assert bot.build_model(generate(services))
+    stat_table = bot._BotModel__stat_table
+    node_list = bot._BotModel__node_list
+
+    stats = len(stat_table)
+    compact = sizeof(stat_table, set()), sizeof(node_list, set())
+    legacy = [sizeof(part, set()) for part in legacy_layout(bot)]
+
+    print(f"services: {len(node_list) - 1}, stats: {stats}")
+    print(f"{'':12}{'stat table':>14}{'node list':>14}{'per stat':>12}")
+    for name, (table, nodes) in [('dict', legacy), ('slots', compact)]:
+        print(f"{name:12}{table / 1e6:>12.2f}MB{nodes / 1e6:>12.2f}MB"
+              f"{(table + nodes) / stats:>11.0f}B")
@@ -0,0 +1,111 @@
+"""benchmark of the definition parser
+
+It compares the keyword-dispatch tokenizer of the parser module with
+the previous pyparsing grammars on a generated definition, and checks
+both of them produce the same script.
+
+Typical usage (in the directory of manage.py):
+python -m benchmark.bench_parser [lines]
+"""
+import logging
+import sys
+import time
+
+import bot_service.service.model.parser as parser
+
+from pyparsing import Suppress, Regex, ParserElement, ParseResults
+from pyparsing.exceptions import ParseException
+
+from bot_service.service.model.bot import CommandEnum
+
+
+__quote = Suppress('"')
+__content_quoted = __quote + Regex(r'[^"]*') + __quote
+__service = Suppress('service') + __content_quoted
+__text = Suppress('text') + __content_quoted + __content_quoted
+__script = Suppress('script') + __content_quoted + __content_quoted
+__script_wating = Suppress('script') + __content_quoted + __content_quoted + __content_quoted
+__faq = Suppress('faq') + __content_quoted
+__faq_item = __content_quoted + Suppress(':') + __content_quoted
+__setting = Suppress('settings')
+
+
+def identify_command_pyparsing(s: str) -> tuple | None:
+    """the previous implementation of parser.identify_command
+    """
+    def safe_parse(pattern: ParserElement, s: str) -> ParseResults | None:
+        try:
+            result = pattern.parse_string(s, parse_all=True)
+        except ParseException:
+            return None
+        return result
+
+    if (r := safe_parse(__service, s)) is not None:
+        return (CommandEnum.Service, r[0])
+    elif (r := safe_parse(__text, s)) is not None:
+        return (CommandEnum.Text, r[0], r[1])
+    elif (r := safe_parse(__script_wating, s)) is not None:
+        return (CommandEnum.ScriptWaiting, r[0], r[1], r[2])
+    elif (r := safe_parse(__script, s)) is not None:
+        return (CommandEnum.Script, r[0], r[1])
+    elif (r := safe_parse(__faq, s)) is not None:
+        return (CommandEnum.FAQ, r[0])
+    elif (r := safe_parse(__faq_item, s)) is not None:
+        return (CommandEnum.KVItem, r[0], r[1])
+    elif (r := safe_parse(__setting, s)) is not None:
+        return (CommandEnum.Setting, )
+    else:
+        return None
+
+
+def generate(lines: int) -> list[str]:
+    """generate a faq heavy definition
+
+    Args:
+        lines (int): approximate number of lines
+
+    Returns:
+        list[str]: lines of the definition
+    """
+    script = [
+        'settings\n',
+        '    "name": "Benchmark Bot"\n',
+        '    "title": "Benchmark"\n'
+    ]
+    serv = 0
+    while len(script) < lines:
+        serv += 1
+        script.append(f'service "service {serv}"\n')
+        script.append(f'    text "text {serv}" "answer of text {serv}"\n')
+        script.append(f'    script "script {serv}" "evaluate"\n')
+        script.append(f'    script "waiting {serv}" "tips {serv}" "check"\n')
+        script.append(f'    faq "faq {serv}"\n')
+        for i in range(95):
+            script.append(f'        "问题 {serv}-{i}？": "回答 {serv}-{i}。"\n')
+    return script
+
+
+def measure(lines: list[str]) -> tuple[float, list]:
+    begin = time.perf_counter()
+    script = parser.analyze(lines)
+    return time.perf_counter() - begin, script
+
+
+if __name__ == '__main__':
+    logging.getLogger().disabled = True
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = generate(n)
+
+    tokenizer = parser.identify_command
+    elapsed, script = measure(lines)
+
+    parser.identify_command = identify_command_pyparsing
+    try:
+        legacy_elapsed, legacy_script = measure(lines)
+    finally:
+        parser.identify_command = tokenizer
+
+    assert script is not None and script == legacy_script
+    print(f"lines:     {len(lines)}")
+    print(f"pyparsing: {legacy_elapsed:.3f}s")
+    print(f"tokenizer: {elapsed:.3f}s ({legacy_elapsed / elapsed:.1f}x)")
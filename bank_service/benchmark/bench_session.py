@@ -0,0 +1,76 @@
+"""time of a request round of the session backends
+
+Each round is what a chat request does with its session: load the
+session of the cookie, change the status, and save it (getting the new
+cookie value). The backends compared are the signed cookies (the
+default), the database (sqlite in memory, without the disk), and the
+shared memory.
+
+Typical usage (in the directory of manage.py):
+python -m benchmark.bench_session [rounds] [sessions]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from importlib import import_module
+
+
+def setup(path: str) -> None:
+    """set up django with the sessions table in memory and a temp shm file
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bank_service.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = ':memory:'
+    settings.SESSION_SHM_PATH = path
+
+    import django
+    from django.core.management import call_command
+    django.setup()
+    call_command('migrate', 'sessions', verbosity=0)
+
+
+def bench(engine: str, rounds: int, sessions: int) -> float:
+    """time the rounds on some sessions
+
+    Args:
+        engine (str): the session engine
+        rounds (int): number of the rounds
+        sessions (int): number of the sessions used in turn
+
+    Returns:
+        float: microseconds per round
+    """
+    SessionStore = import_module(engine).SessionStore
+    cookies = []
+    for i in range(sessions):
+        session = SessionStore()
+        session['schema'] = '2b72776c738f717b'
+        session['status'] = i
+        session['revision'] = 'c8f4bda8f649de0a986dc0420d55c605'
+        session.save()
+        cookies.append(session.session_key)
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        session = SessionStore(cookies[i % sessions])
+        session['status'] = session['status'] + 1
+        session.save()
+        cookies[i % sessions] = session.session_key
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+if __name__ == '__main__':
+    logging.getLogger().disabled = True
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup(os.path.join(directory, 'sessions'))
+        print(f"rounds: {rounds}, sessions: {sessions}")
+        for name, engine in [('signed_cookies', 'django.contrib.sessions.backends.signed_cookies'),
+                             ('db', 'django.contrib.sessions.backends.db'),
+                             ('shm', 'bot_service.backends.shm')]:
+            print(f"{name:16}{bench(engine, rounds, sessions):>10.1f}us")
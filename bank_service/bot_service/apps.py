@@ -4,3 +4,36 @@ from django.apps import AppConfig
 class BotServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bot_service'
+
+    def ready(self) -> None:
+        import bank_service.settings as settings
+
+        from bot_service.service.model.breaker import CircuitBreaker
+        from bot_service.service.model.executor import ScriptExecutor
+        from bot_service.service.model.script import ScriptHandler
+
+        if settings.SCRIPT_POOL is not None:
+            ScriptHandler.executor = ScriptExecutor(
+                settings.SCRIPT_POOL, settings.SCRIPT_POOL_SIZE,
+                settings.SCRIPT_QUEUE_SIZE, settings.SCRIPT_TIMEOUT)
+
+        CircuitBreaker.threshold = settings.SCRIPT_BREAKER_FAILURES
+        CircuitBreaker.window = settings.SCRIPT_BREAKER_WINDOW
+        CircuitBreaker.cooldown = settings.SCRIPT_BREAKER_COOLDOWN
+
+
+def start() -> None:
+    """warm up the definitions and watch them for the changes
+
+    Called by the server entry points (wsgi.py and asgi.py), not in ready,
+    so the other manage.py commands (migrate, shell, tests) neither build
+    the definitions nor start a polling thread.
+    """
+    import bank_service.settings as settings
+
+    if settings.BOT_WARMUP or settings.BOT_RELOAD_INTERVAL > 0:
+        import bot_service.service.model.loader as loader
+
+        loader.warm_up(settings.BOT_WARMUP, settings.BOT_BUILD_WORKERS)
+        if settings.BOT_RELOAD_INTERVAL > 0:
+            loader.watch(settings.BOT_RELOAD_INTERVAL)
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""the session backend keeping the sessions in the memory of the process
+
+The signed cookies backend verifies and signs the whole session on each
+request, and sends it back in each response. This backend keeps the
+sessions in a dict of this process instead, so only the session key is
+in the cookie. It suits a single worker process, since the sessions are
+not shared among processes.
+
+The sessions are kept in the order of their last use, so getting and
+setting a session are O(1), the least recently used session is dropped
+when SESSION_MEMORY_MAX_ENTRIES is reached, and the expired sessions
+(SESSION_COOKIE_AGE after their last use) are at the front, swept by a
+Crontab task every SESSION_MEMORY_SWEEP_INTERVAL seconds.
+
+Typical usage (settings.py):
+SESSION_ENGINE = 'bot_service.backends.memory'
+"""
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase, UpdateError
+
+from bot_service.service.util.crontab import Crontab
+
+
+class MemoryStore:
+    """the lru dict of the sessions, expiring after their ttl
+    """
+
+    def __init__(self, max_entries: int, sweep_interval: float) -> None:
+        """init
+
+        Args:
+            max_entries (int): max number of the sessions
+            sweep_interval (float): seconds between the sweeps of the
+            expired sessions
+        """
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.__items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__crontab: Crontab | None = None
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def get(self, key: str, ttl: float) -> dict | None:
+        """get a session, refreshing its expiry
+
+        Args:
+            key (str): the session key
+            ttl (float): seconds to keep the session from now
+
+        Returns:
+            dict: a copy of the session data
+            None: not found or expired
+        """
+        now = time.time()
+        with self.__lock:
+            if (item := self.__items.get(key)) is None:
+                return None
+            if item[0] <= now:
+                del self.__items[key]
+                return None
+            self.__items[key] = (now + ttl, item[1])
+            self.__items.move_to_end(key)
+            return item[1].copy()
+
+    def set(self, key: str, data: dict, ttl: float, must_create: bool = False) -> bool:
+        """set a session
+
+        Args:
+            key (str): the session key
+            data (dict): the session data (copied)
+            ttl (float): seconds to keep the session from now
+            must_create (bool, optional): fail if the session exists.
+            Defaults to False (fail if not).
+
+        Returns:
+            bool: False if failed
+        """
+        now = time.time()
+        with self.__lock:
+            item = self.__items.get(key)
+            if (item is not None and item[0] > now) == must_create:
+                return False
+            self.__items[key] = (now + ttl, data.copy())
+            self.__items.move_to_end(key)
+            if len(self.__items) > self.max_entries:
+                self.__items.popitem(last=False)
+        if self.__crontab is None:
+            self.__start()
+        return True
+
+    def delete(self, key: str) -> None:
+        """delete a session
+
+        Args:
+            key (str): the session key
+        """
+        with self.__lock:
+            self.__items.pop(key, None)
+
+    def sweep(self) -> int:
+        """drop the expired sessions
+
+        The sessions at the front are the least recently used, so the
+        sweep stops at the first session not expired (a session with a
+        longer custom expiry may delay the sweep of the others until they
+        are used or evicted).
+
+        Returns:
+            int: number of the sessions dropped
+        """
+        now = time.time()
+        count = 0
+        with self.__lock:
+            while self.__items:
+                key, item = next(iter(self.__items.items()))
+                if item[0] > now:
+                    break
+                del self.__items[key]
+                count += 1
+        return count
+
+    def __start(self) -> None:
+        with self.__lock:
+            if self.__crontab is not None:
+                return
+            self.__crontab = Crontab()
+
+        def sweep() -> None:
+            self.sweep()
+            self.__crontab.add(str(uuid.uuid4()), self.sweep_interval, sweep)
+
+        self.__crontab.add(str(uuid.uuid4()), self.sweep_interval, sweep)
+
+
+store = MemoryStore(getattr(settings, 'SESSION_MEMORY_MAX_ENTRIES', 100000),
+                    getattr(settings, 'SESSION_MEMORY_SWEEP_INTERVAL', 60))
+
+
+class SessionStore(SessionBase):
+    """the session store kept in the memory of the process
+    """
+
+    def load(self) -> dict:
+        # the expiry of the session is not known before loaded, refreshed
+        # by the default age here (and by its own when saved)
+        data = store.get(self._get_or_create_session_key(), settings.SESSION_COOKIE_AGE)
+        if data is None:
+            self._session_key = None
+            return {}
+        return data
+
+    def exists(self, session_key: str) -> bool:
+        return bool(session_key) and store.get(session_key, settings.SESSION_COOKIE_AGE) is not None
+
+    def create(self) -> None:
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue  # key collision
+            self.modified = True
+            return
+
+    def save(self, must_create: bool = False) -> None:
+        if self.session_key is None:
+            return self.create()
+        if not store.set(self.session_key, self._get_session(no_load=must_create),
+                         self.get_expiry_age(), must_create):
+            raise CreateError if must_create else UpdateError
+
+    def delete(self, session_key: str = None) -> None:
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        store.delete(session_key)
+
+    @classmethod
+    def clear_expired(cls) -> None:
+        store.sweep()
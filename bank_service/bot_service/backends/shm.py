@@ -0,0 +1,352 @@
+"""the session backend keeping the sessions in shared memory
+
+The sessions are kept in a memory-mapped file (under /dev/shm if there
+is one) shared by all the worker processes, so a user can be served by
+any worker without a database round-trip.
+
+The file is a fixed table of slots, grouped into buckets. A session key
+is hashed to a bucket, and its record (the digest of the key, the expiry
+and the compact session data, e.g. schema and status) takes a slot of the
+bucket: a free or expired one, or else the one expiring first. A bucket
+is locked by its lock stripe, a thread lock together with a lock of one
+byte of the file among the processes. A session is also locked from
+loading until saving it by the chat apis (see hold), with a lock of its
+own byte after the table.
+
+Typical usage (settings.py):
+SESSION_ENGINE = 'bot_service.backends.shm'
+"""
+import asyncio
+import errno
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase, UpdateError
+
+from bot_service.service.util.lock import StripedLock
+
+
+MAGIC = b'BSSM'
+HEADER = struct.Struct('<4sIII')  # magic, buckets, bucket size, slot size
+HEADER_SIZE = 64
+RECORD = struct.Struct('<16sdH')  # digest, expiry, length of data
+SLOT_SIZE = 256
+DATA_SIZE = SLOT_SIZE - RECORD.size
+EMPTY = bytes(16)
+
+
+def default_path() -> str:
+    """get the default path of the file, in memory if possible
+
+    Returns:
+        str: the path
+    """
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'bank_service_sessions')
+
+
+class SharedStore:
+    """the table of the sessions in a memory-mapped file
+    """
+
+    def __init__(self, path: str, buckets: int = 8192, bucket_size: int = 8,
+                 stripes: int = 64) -> None:
+        """init, creating the file if not existed (or of other layout)
+
+        Args:
+            path (str): path of the file
+            buckets (int, optional): number of buckets. Defaults to 8192.
+            bucket_size (int, optional): slots of a bucket. Defaults to 8.
+            stripes (int, optional): number of locks. Defaults to 64.
+        """
+        self.buckets = buckets
+        self.bucket_size = bucket_size
+        self.stripes = stripes
+        self.__locks = [threading.Lock() for _ in range(stripes)]
+        size = HEADER_SIZE + buckets * bucket_size * SLOT_SIZE
+        header = HEADER.pack(MAGIC, buckets, bucket_size, SLOT_SIZE)
+
+        self.__fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.__fd, fcntl.LOCK_EX)  # the whole file, while checking
+        try:
+            if os.fstat(self.__fd).st_size != size or os.pread(self.__fd, HEADER.size, 0) != header:
+                os.ftruncate(self.__fd, 0)  # drop the sessions of another layout
+                os.ftruncate(self.__fd, size)
+                os.pwrite(self.__fd, header, 0)
+        finally:
+            fcntl.lockf(self.__fd, fcntl.LOCK_UN)
+        self.__map = mmap.mmap(self.__fd, size)
+        self.__size = size  # the session locks are the bytes after the table
+        self.__sessions = StripedLock(stripes)  # the threads of this process
+
+    def __locate(self, key: str) -> tuple[bytes, int, int]:
+        """get the digest, the offset of the bucket and the stripe of a key
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        bucket = int.from_bytes(digest[:8], 'little') % self.buckets
+        offset = HEADER_SIZE + bucket * self.bucket_size * SLOT_SIZE
+        return digest, offset, bucket % self.stripes
+
+    def __lock(self, stripe: int) -> None:
+        self.__locks[stripe].acquire()
+        fcntl.lockf(self.__fd, fcntl.LOCK_EX, 1, stripe)
+
+    def __unlock(self, stripe: int) -> None:
+        fcntl.lockf(self.__fd, fcntl.LOCK_UN, 1, stripe)
+        self.__locks[stripe].release()
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        """hold the lock of a session among all the processes
+
+        It is held from loading the session until saving it, so the
+        messages of a session are handled in turn by all the workers. The
+        locks are striped like the buckets, but apart from them.
+
+        Args:
+            key (str): the session key
+        """
+        stripe = self.__session_stripe(key)
+        with self.__sessions.hold(stripe):
+            fcntl.lockf(self.__fd, fcntl.LOCK_EX, 1, self.__size + stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.__fd, fcntl.LOCK_UN, 1, self.__size + stripe)
+
+    @asynccontextmanager
+    async def hold_async(self, key: str) -> AsyncIterator[None]:
+        """hold the lock of a session on an event loop (see hold)
+
+        The lock held by another process is polled like a stripe of
+        StripedLock, not waited in a thread.
+
+        Args:
+            key (str): the session key
+        """
+        stripe = self.__session_stripe(key)
+        async with self.__sessions.hold_async(stripe):
+            delay = StripedLock.POLL_MIN
+            while True:
+                try:
+                    fcntl.lockf(self.__fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self.__size + stripe)
+                    break
+                except OSError as e:
+                    if e.errno not in (errno.EACCES, errno.EAGAIN):
+                        raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, StripedLock.POLL_MAX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.__fd, fcntl.LOCK_UN, 1, self.__size + stripe)
+
+    def __session_stripe(self, key: str) -> int:
+        # a digest, not hash(), to be the same in every process
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % self.stripes
+
+    def __find(self, digest: bytes, offset: int, now: float) -> tuple[int | None, int]:
+        """find the slot of a digest in a bucket
+
+        Returns:
+            tuple[int | None, int]: (the slot of the digest (None if not
+            found), the slot to take if not found)
+        """
+        free, free_expiry = offset, None
+        for slot in range(offset, offset + self.bucket_size * SLOT_SIZE, SLOT_SIZE):
+            record, expiry, _ = RECORD.unpack_from(self.__map, slot)
+            if record == digest and expiry > now:
+                return slot, slot
+            if record == EMPTY or expiry <= now:
+                expiry = 0.0
+            if free_expiry is None or expiry < free_expiry:
+                free, free_expiry = slot, expiry
+        return None, free
+
+    def get(self, key: str, ttl: float) -> dict | None:
+        """get a session, refreshing its expiry
+
+        Args:
+            key (str): the session key
+            ttl (float): seconds to keep the session from now
+
+        Returns:
+            dict: the session data
+            None: not found or expired
+        """
+        digest, offset, stripe = self.__locate(key)
+        now = time.time()
+        self.__lock(stripe)
+        try:
+            slot, _ = self.__find(digest, offset, now)
+            if slot is None:
+                return None
+            _, _, length = RECORD.unpack_from(self.__map, slot)
+            RECORD.pack_into(self.__map, slot, digest, now + ttl, length)
+            data = self.__map[slot + RECORD.size:slot + RECORD.size + length]
+        finally:
+            self.__unlock(stripe)
+        return json.loads(data)
+
+    def set(self, key: str, data: dict, ttl: float, must_create: bool = False) -> bool:
+        """set a session
+
+        Args:
+            key (str): the session key
+            data (dict): the session data, serializable by json
+            ttl (float): seconds to keep the session from now
+            must_create (bool, optional): fail if the session exists.
+            Defaults to False (fail if not).
+
+        Raises:
+            ValueError: the data is too large for a slot
+
+        Returns:
+            bool: False if failed
+        """
+        encoded = json.dumps(data, separators=(',', ':')).encode()
+        if len(encoded) > DATA_SIZE:
+            raise ValueError("session data of %d bytes exceeds the slot." % len(encoded))
+        digest, offset, stripe = self.__locate(key)
+        now = time.time()
+        self.__lock(stripe)
+        try:
+            slot, free = self.__find(digest, offset, now)
+            if (slot is not None) == must_create:
+                return False
+            slot = free if slot is None else slot
+            RECORD.pack_into(self.__map, slot, digest, now + ttl, len(encoded))
+            self.__map[slot + RECORD.size:slot + RECORD.size + len(encoded)] = encoded
+        finally:
+            self.__unlock(stripe)
+        return True
+
+    def delete(self, key: str) -> None:
+        """delete a session
+
+        Args:
+            key (str): the session key
+        """
+        digest, offset, stripe = self.__locate(key)
+        self.__lock(stripe)
+        try:
+            slot, _ = self.__find(digest, offset, time.time())
+            if slot is not None:
+                RECORD.pack_into(self.__map, slot, EMPTY, 0.0, 0)
+        finally:
+            self.__unlock(stripe)
+
+    def sweep(self) -> int:
+        """clear the expired sessions
+
+        Expired slots are reused anyway, so it is only for tidiness.
+
+        Returns:
+            int: number of the sessions cleared
+        """
+        count = 0
+        now = time.time()
+        buckets_size = self.bucket_size * SLOT_SIZE
+        for bucket in range(self.buckets):
+            offset = HEADER_SIZE + bucket * buckets_size
+            stripe = bucket % self.stripes
+            self.__lock(stripe)
+            try:
+                for slot in range(offset, offset + buckets_size, SLOT_SIZE):
+                    record, expiry, _ = RECORD.unpack_from(self.__map, slot)
+                    if record != EMPTY and expiry <= now:
+                        RECORD.pack_into(self.__map, slot, EMPTY, 0.0, 0)
+                        count += 1
+            finally:
+                self.__unlock(stripe)
+        return count
+
+
+__store: SharedStore | None = None
+__store_lock = threading.Lock()
+
+
+def get_store() -> SharedStore:
+    """get the store of this process, opening the file on first use
+
+    Returns:
+        SharedStore: the store
+    """
+    global __store
+    if __store is None:
+        with __store_lock:
+            if __store is None:
+                __store = SharedStore(
+                    getattr(settings, 'SESSION_SHM_PATH', None) or default_path(),
+                    getattr(settings, 'SESSION_SHM_BUCKETS', 8192),
+                    getattr(settings, 'SESSION_SHM_BUCKET_SIZE', 8),
+                    getattr(settings, 'SESSION_SHM_STRIPES', 64))
+    return __store
+
+
+class SessionStore(SessionBase):
+    """the session store kept in shared memory
+    """
+
+    def load(self) -> dict:
+        # the expiry of the session is not known before loaded, refreshed
+        # by the default age here (and by its own when saved)
+        data = get_store().get(self._get_or_create_session_key(), settings.SESSION_COOKIE_AGE)
+        if data is None:
+            self._session_key = None
+            return {}
+        return data
+
+    def exists(self, session_key: str) -> bool:
+        return bool(session_key) and get_store().get(session_key, settings.SESSION_COOKIE_AGE) is not None
+
+    def create(self) -> None:
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue  # key collision
+            self.modified = True
+            return
+
+    def save(self, must_create: bool = False) -> None:
+        if self.session_key is None:
+            return self.create()
+        if not get_store().set(self.session_key, self._get_session(no_load=must_create),
+                               self.get_expiry_age(), must_create):
+            raise CreateError if must_create else UpdateError
+
+    def delete(self, session_key: str = None) -> None:
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        get_store().delete(session_key)
+
+    def hold(self):
+        """hold the lock of this session among the processes (see
+        SharedStore.hold)
+        """
+        return get_store().hold(self.session_key)
+
+    def hold_async(self):
+        """hold the lock of this session on an event loop
+        """
+        return get_store().hold_async(self.session_key)
+
+    @classmethod
+    def clear_expired(cls) -> None:
+        get_store().sweep()
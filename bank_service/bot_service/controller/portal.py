@@ -19,10 +19,10 @@ import bot_service.service.data.portal as data
 import bot_service.service.util.validate as validator
 import serv_auth.auth as auth
 
-from bot_service.service.util.resp import fail, success, expire
+from bot_service.service.util.resp import conditional, fail, success, expire
 
 from django.http.request import HttpRequest
-from django.http.response import JsonResponse
+from django.http.response import HttpResponse, JsonResponse
 
 
 detail_schema = {
@@ -35,41 +35,52 @@ detail_schema = {
 
 
 @auth.preprocessToken
-def option(request: HttpRequest) -> JsonResponse:
+async def option(request: HttpRequest) -> HttpResponse:
     """portal option api
 
+    The response has a strong etag, and If-None-Match is answered with
+    304 if matched.
+
     Args:
         request (HttpRequest): user request
 
     Returns:
-        JsonResponse: response
+        HttpResponse: response
     """
     try:
-        resp = data.option()
+        body, etag = data.option_response()
     except Exception as e:
         return JsonResponse(fail(str(e)))
-    return JsonResponse(success(resp))
+    return conditional(request, body, etag)
 
 
 @auth.preprocessToken
-def detail(request: HttpRequest) -> JsonResponse:
+async def detail(request: HttpRequest) -> HttpResponse:
     """portal detail api
 
-    return the detail of asked schema
+    return the detail of asked schema. The schema can also be passed by
+    GET /detail?schema=<schema>, so the response can be cached. The
+    response has a strong etag, and If-None-Match is answered with 304
+    if matched.
 
     Args:
         request (HttpRequest): user request
 
     Returns:
-        JsonResponse: response
+        HttpResponse: response
     """
-    stat, res = validator.validate(request, detail_schema)
-    if stat == validator.FAIL:
-        return JsonResponse(res)
+    if request.method == 'GET':
+        if (schema := request.GET.get('schema')) is None:
+            return JsonResponse(fail("bad request: schema is required"))
+        res = {'schema': schema}
+    else:
+        stat, res = validator.validate(request, detail_schema)
+        if stat == validator.FAIL:
+            return JsonResponse(res)
 
     try:
-        resp = data.detail(res)
+        body, etag = await data.detail_response_async(res)
     except Exception as e:
         return JsonResponse(fail(str(e)))
 
-    return JsonResponse(success(resp))
\ No newline at end of file
+    return conditional(request, body, etag)
\ No newline at end of file
@@ -13,7 +13,8 @@ import session
 
 urlpatterns = [
     path('init', session.init),
-    path('message', session.message)
+    path('message', session.message),
+    path('messages', session.messages)
 ]
 """
 import bot_service.service.data.session as data
@@ -44,9 +45,22 @@ message_schema = {
     }
 }
 
+# json schema defines what messages api wants
+messages_schema = {
+    'type': 'object',
+    'required': ['contents'],
+    'properties': {
+        'contents': {
+            'type': 'array',
+            'items': {'type': 'string'},
+            'maxItems': 100
+        }
+    }
+}
+
 
 @auth.preprocessToken
-def init(request: HttpRequest) -> JsonResponse:
+async def init(request: HttpRequest) -> JsonResponse:
     """session initialization api
 
     Args:
@@ -60,14 +74,14 @@ def init(request: HttpRequest) -> JsonResponse:
         return JsonResponse(res)
 
     try:
-        resp = data.init(request.session, res)
+        resp = await data.init_async(request.session, res)
     except Exception as e:
         return JsonResponse(fail(str(e)))
     return JsonResponse(success(resp))
 
 
 @auth.preprocessToken
-def message(request: HttpRequest) -> JsonResponse:
+async def message(request: HttpRequest) -> JsonResponse:
     """message handling api
 
     Args:
@@ -81,7 +95,34 @@ def message(request: HttpRequest) -> JsonResponse:
         return JsonResponse(res)
 
     try:
-        resp = data.message(request.session, res)
+        resp = await data.message_async(request.session, res)
+    except TimeoutError as e:
+        return JsonResponse(expire(str(e)))
+    except Exception as e:
+        return JsonResponse(fail(str(e)))
+
+    return JsonResponse(success(resp))
+
+
+@auth.preprocessToken
+async def messages(request: HttpRequest) -> JsonResponse:
+    """batch message handling api
+
+    The messages are handled in order, and the replies are grouped by
+    message.
+
+    Args:
+        request (HttpRequest): user request
+
+    Returns:
+        JsonResponse: response
+    """
+    stat, res = validator.validate(request, messages_schema)
+    if stat == validator.FAIL:
+        return JsonResponse(res)
+
+    try:
+        resp = await data.messages_async(request.session, res)
     except TimeoutError as e:
         return JsonResponse(expire(str(e)))
     except Exception as e:
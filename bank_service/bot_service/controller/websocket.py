@@ -0,0 +1,152 @@
+"""this module provides the chat interface over websocket
+
+A long conversation over the http api pays for the token, the json
+schema check and the session cookie on every message. A websocket
+connection checks the token once when connecting and keeps the chat
+state itself, and the replies are pushed back as soon as handled, by
+the same bot models (see loader) as the http api.
+
+The frames are the request bodies of the http api, {"schema": ...} to
+init the chat and {"content": ...} for a message, and each is answered
+by a frame of the http response body.
+
+Typical usage (asgi.py):
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket' and scope['path'] == websocket.PATH:
+        return await websocket.chat(scope, receive, send)
+    return await django_application(scope, receive, send)
+"""
+import asyncio
+import json
+import time
+
+import bot_service.service.model.loader as loader
+import bot_service.service.util.validate as validator
+import serv_auth.auth as auth
+
+from urllib.parse import parse_qs
+
+from bot_service.service.model.bot import BotModel
+from bot_service.service.util.resp import fail, success
+
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+
+PATH = '/api/bot/chat/socket'
+
+# json schema defines what a frame wants, init or message
+frame_schema = {
+    'type': 'object',
+    'properties': {
+        'schema': {'type': 'string'},
+        'content': {'type': 'string'}
+    },
+    'oneOf': [
+        {'required': ['schema']},
+        {'required': ['content']}
+    ]
+}
+
+
+class Conversation:
+    """the chat state of a connection
+    """
+    __slots__ = ('expire', 'schema', 'bot', 'stat')
+
+    def __init__(self, expire: int) -> None:
+        self.expire = expire  # of the token
+        self.schema: str | None = None
+        self.bot: BotModel | None = None
+        self.stat = 0
+
+
+async def chat(scope: dict, receive, send) -> None:
+    """websocket chat api (an asgi application)
+
+    The token is read from the query string (token=..., since a browser
+    cannot set the headers of a websocket) or the Authorization header.
+    If it is missing or invalid, the error of the http api is sent and
+    the connection is closed, as it is when the token expires.
+
+    Args:
+        scope (dict): the connection scope
+        receive: the asgi receive channel
+        send: the asgi send channel
+    """
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+    if (token := __token(scope)) is None:
+        return await __close(send, {'code': 50008, 'msg': 'need login'})
+    try:
+        payload = auth.verifyToken(token)
+    except ExpiredSignatureError:
+        return await __close(send, {'code': 50014, 'msg': 'token expired'})
+    except InvalidTokenError:
+        return await __close(send, {'code': 50008, 'msg': 'token broken'})
+
+    conversation = Conversation(payload.get('exp') or 0)
+    while True:
+        event = await receive()
+        if event['type'] == 'websocket.disconnect':
+            return
+        if conversation.expire and time.time() >= conversation.expire:
+            return await __close(send, {'code': 50014, 'msg': 'token expired'})
+        frame = event.get('text')
+        if frame is None:
+            frame = event.get('bytes') or b''
+        await __send(send, await __handle(conversation, frame))
+
+
+async def __handle(conversation: Conversation, frame: str | bytes) -> dict:
+    stat, res = validator.validate_json(frame, frame_schema)
+    if stat == validator.FAIL:
+        return res
+
+    try:
+        if 'schema' in res:
+            if (bot := await __get_bot(res['schema'])) is None:
+                return fail("unknown schema")
+            conversation.schema, conversation.bot = res['schema'], bot
+            conversation.stat, reps = await bot.handle_message_async(0, None)
+        else:
+            if conversation.schema is None:
+                return fail("illegal access")
+            if (bot := await __get_bot(conversation.schema)) is None:
+                return fail("non-existed schema")
+            stat = conversation.stat
+            if bot is not conversation.bot:  # reloaded since the last message
+                if (stat := bot.find_stat(conversation.bot.get_stat_key(stat))) is None:
+                    stat = 0  # removed, back to the root
+                conversation.bot = bot
+            conversation.stat, reps = await bot.handle_message_async(stat, res['content'])
+    except Exception as e:
+        return fail(str(e))
+
+    now = round(time.time() * 1000)
+    return success([{'content': r, 'time': now} for r in reps])
+
+
+async def __get_bot(schema: str) -> BotModel | None:
+    if (bot := loader.bots.get(schema)) is not None:
+        return bot
+    return await asyncio.to_thread(loader.get_bot, schema)  # built on first use
+
+
+def __token(scope: dict) -> str | None:
+    tokens = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+    if tokens:
+        return tokens[0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            return value.decode('latin-1')
+    return None
+
+
+async def __send(send, resp: dict) -> None:
+    await send({'type': 'websocket.send', 'text': json.dumps(resp)})
+
+
+async def __close(send, resp: dict) -> None:
+    await __send(send, resp)
+    await send({'type': 'websocket.close', 'code': 1008})
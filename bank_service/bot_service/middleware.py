@@ -0,0 +1,53 @@
+"""the session middleware aware of the sessions saved under their locks
+
+The chat apis save the session while holding its lock (see
+service/data/session.py). Saving it again after the response, as the
+session middleware of django does for a modified session, would be out
+of the lock, and may overwrite the next message of the session. The
+middleware here sends the cookie of such a session as django does, but
+without saving it again.
+
+Typical usage (settings.py):
+MIDDLEWARE = [
+    ...
+    'bot_service.middleware.SessionMiddleware',
+    ...
+]
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware as DjangoSessionMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+
+class SessionMiddleware(DjangoSessionMiddleware):
+    """the session middleware not saving a committed session again
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if not getattr(session, 'committed', False):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Cookie',))
+        if session.is_empty() or response.status_code == 500:
+            return response
+        if session.get_expire_at_browser_close():
+            max_age = None
+            expires = None
+        else:
+            max_age = session.get_expiry_age()
+            expires = http_date(time.time() + max_age)
+        # refresh the client cookie, even if the session key is unchanged
+        response.set_cookie(
+            settings.SESSION_COOKIE_NAME,
+            session.session_key, max_age=max_age,
+            expires=expires, domain=settings.SESSION_COOKIE_DOMAIN,
+            path=settings.SESSION_COOKIE_PATH,
+            secure=settings.SESSION_COOKIE_SECURE or None,
+            httponly=settings.SESSION_COOKIE_HTTPONLY or None,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+        return response
@@ -13,14 +13,26 @@ except Exception as e:
 return JsonResponse(success(resp))
 
 """
+import asyncio
+
 import bot_service.service.model.loader as loader
 
+from bot_service.service.model.bot import BotModel
+from bot_service.service.util.resp import serialize, success
+
 from django.contrib.sessions.backends.base import SessionBase
 
 
+# the serialized responses, rebuilt when the definitions are changed
+__option: tuple[int, bytes, str] = (-1, b'', '')  # (loader.version, body, etag)
+__details: dict[str, tuple[BotModel, bytes, str]] = {}  # schema -> (bot, body, etag)
+
+
 def option() -> list:
     """show all the options
 
+    The definitions failed to build are left out, until changed.
+
     Args:
         session (SessionBase): a user session
 
@@ -29,12 +41,12 @@ def option() -> list:
     """
 
     rep = []
-    for schema_id, bot in loader.bots.items():
-        settings = bot.get_settings()
-        title = settings['title']
+    for schema_id, definition in loader.index.items():
+        if definition.failed:
+            continue
         rep.append({
             'schema': schema_id,
-            'title': title
+            'title': definition.title
         })
     return rep
 
@@ -48,7 +60,54 @@ def detail(req: dict) -> dict:
     Returns:
         list: detail
     """
-    bot = loader.bots.get(req['schema'])
+    bot = loader.get_bot(req['schema'])
     if bot is None:
         return {}
-    return bot.get_settings()
\ No newline at end of file
+    return bot.get_settings()
+
+
+def option_response() -> tuple[bytes, str]:
+    """get the serialized success response of option
+
+    Returns:
+        tuple[bytes, str]: (body, etag)
+    """
+    global __option
+    version = loader.version
+    if __option[0] != version:
+        __option = (version, ) + serialize(success(option()))
+    return __option[1:]
+
+
+def detail_response(req: dict) -> tuple[bytes, str]:
+    """get the serialized success response of detail
+
+    Args:
+        req (dict): a verified user request
+
+    Returns:
+        tuple[bytes, str]: (body, etag)
+    """
+    schema = req['schema']
+    if (bot := loader.get_bot(schema)) is None:
+        __details.pop(schema, None)  # removed
+        return serialize(success({}))
+    if (cached := __details.get(schema)) is None or cached[0] is not bot:
+        cached = __details[schema] = (bot, ) + serialize(success(bot.get_settings()))
+    return cached[1:]
+
+
+async def detail_response_async(req: dict) -> tuple[bytes, str]:
+    """get the serialized success response of detail on an event loop
+
+    A model not built yet is built in a thread.
+
+    Args:
+        req (dict): a verified user request
+
+    Returns:
+        tuple[bytes, str]: (body, etag)
+    """
+    if req['schema'] in loader.bots:
+        return detail_response(req)
+    return await asyncio.to_thread(detail_response, req)
@@ -13,27 +13,87 @@ except Exception as e:
 return JsonResponse(success(resp))
 
 """
+import asyncio
 import time
-# import threading
-# import uuid
 import bank_service.settings as settings
 from bot_service.service.model.exception import ServiceException
 
 import bot_service.service.model.loader as loader
 
-from bot_service.service.util.crontab import Crontab
+from bot_service.service.model.bot import BotModel
+from bot_service.service.util.lock import StripedLock
+
+from asgiref.sync import sync_to_async
+from contextlib import nullcontext
 
 from django.contrib.sessions.backends.base import SessionBase
 
 
-# session_locks = {}
-# 
-# crontab = Crontab()
-# 
-# 
-# def on_expire(key: str):
-#     if key in session_locks:
-#         del session_locks[key]
+# the messages of a session are handled one by one
+session_locks = StripedLock(getattr(settings, 'SESSION_LOCK_STRIPES', 1024))
+
+
+def __hold(session: SessionBase):
+    """hold the lock of a session, before the session is loaded
+
+    A new session (no key in the cookie) has nothing to race on. A session
+    backend locking a session across the processes (see backends/shm.py)
+    is used instead of the locks of this process.
+    """
+    if (key := session.session_key) is None:
+        return nullcontext()
+    if hasattr(session, 'hold'):
+        return session.hold()
+    return session_locks.hold(key)
+
+
+def __hold_async(session: SessionBase):
+    """hold the lock of a session on an event loop (see __hold)
+    """
+    if (key := session.session_key) is None:
+        return nullcontext()
+    if hasattr(session, 'hold_async'):
+        return session.hold_async()
+    return session_locks.hold_async(key)
+
+
+def __commit(session: SessionBase, values: dict) -> None:
+    """update and save a session while holding its lock
+
+    The session is marked committed, so the middleware (see
+    bot_service/middleware.py) only refreshes its cookie, instead of saving
+    it again out of the lock, which may overwrite the next message.
+    """
+    session.update(values)
+    session.save()
+    session.committed = True
+
+
+def __restore(session: SessionBase):
+    """get the bot model and the stat of a session (holding its lock)
+    """
+    schema = session.get('schema')
+    stat = session.get('status')
+
+    if schema is None or stat is None:
+        raise ServiceException("illegal access")
+
+    if (bot := loader.get_bot(schema)) is None:
+        raise ServiceException("non-existed schema")
+
+    # the definition was changed since the stat was saved, the stat is
+    # only a cache of its key then
+    revision = session.get('revision')
+    if revision is not None and revision != bot.get_revision():
+        if (stat := bot.find_stat(session.get('stat_key'))) is None:
+            stat = 0  # removed, back to the root
+    return bot, stat
+
+
+def __state(bot: BotModel, stat: int) -> dict:
+    """get the session values of a stat
+    """
+    return {'status': stat, 'stat_key': bot.get_stat_key(stat), 'revision': bot.get_revision()}
 
 
 def init(session: SessionBase, req: dict) -> list:
@@ -48,32 +108,13 @@ def init(session: SessionBase, req: dict) -> list:
     Returns:
         list: message list
     """
-    # key = session.get('key')
-    # if key is None:
-    #     session['key'] = str(uuid.uuid4())
     schema = req['schema']
-    if schema not in loader.bots:
+    if (bot := loader.get_bot(schema)) is None:
         raise ServiceException("unknown schema")
-    
-    session['schema'] = schema
-    session['status'] = 0
-    
-    bot = loader.bots[schema]
-    # if key not in session_locks:
-    #     lock = threading.RLock()
-    #     session_locks[key] = lock
-    # else:
-    #     lock = session_locks[key]
-    
-    # crontab.add(key, settings.SESSION_COOKIE_AGE, on_expire, (key, ))
-    
-    try:
-        # lock.acquire()
+
+    with __hold(session):
         _, reps = bot.handle_message(0, None)
-        # lock.release()
-    except Exception as e:
-        # lock.release()
-        raise e
+        __commit(session, {'schema': schema, **__state(bot, 0)})
 
     rep = []
     for r in reps:
@@ -87,6 +128,12 @@ def init(session: SessionBase, req: dict) -> list:
 def message(session: SessionBase, req: dict) -> list:
     """handle a messgae request
 
+    The session is locked before loaded, so the messages of a session sent
+    at once are handled in turn, each from the stat saved by the previous
+    one. It holds among the threads of this process, or among the
+    processes with the shm backend; the signed cookies keep the stat in
+    the request, so only the handling is in turn with them.
+
     Args:
         session (SessionBase): an user session
         req (dict): a verified user request
@@ -98,36 +145,125 @@ def message(session: SessionBase, req: dict) -> list:
         list: message list
     """
     msg = req['content']
-    # key = session.get('key')
-    # lock: threading.RLock = session_locks.get(key)
-
-    # if lock is None:
-    #     raise TimeoutError("timeout")
-    
-    schema = session.get('schema')
-    stat = session.get('status')
-
-    if schema is None or stat is None:
-        raise ServiceException("illegal access")
-    
-    if schema not in loader.bots:
-        raise ServiceException("non-existed schema")
-    
-    bot = loader.bots[schema]
-
-    try:
-        # lock.acquire()
+    with __hold(session):
+        bot, stat = __restore(session)
         stat, reps = bot.handle_message(stat, msg)
-        # lock.release()
-    except Exception as e:
-        # lock.release()
-        raise e
+        __commit(session, __state(bot, stat))
 
-    session['status'] = stat
     rep = []
     for r in reps:
         rep.append({
             'content': r,
             'time': round(time.time() * 1000)
         })
-    return rep
\ No newline at end of file
+    return rep
+
+
+def messages(session: SessionBase, req: dict) -> list:
+    """handle several messages of a request in order
+
+    The stat after each message is the stat of the next one, and only the
+    last stat is saved. If one of the messages fails, none is applied.
+
+    Args:
+        session (SessionBase): an user session
+        req (dict): a verified user request
+
+    Raises:
+        Exception: the exception during generating messages to reply
+
+    Returns:
+        list: message list of each message
+    """
+    with __hold(session):
+        bot, stat = __restore(session)
+        results = bot.handle_conversation(req['contents'], stat)
+        if results:
+            stat = results[-1][0]
+        __commit(session, __state(bot, stat))
+
+    now = round(time.time() * 1000)
+    return [[{'content': r, 'time': now} for r in reps] for _, reps in results]
+
+
+async def init_async(session: SessionBase, req: dict) -> list:
+    """init a session on an event loop
+
+    The same as init, but a model not built yet is built in a thread, and
+    the session is saved by django's sync adapter (it may be in the
+    database).
+
+    Args:
+        session (SessionBase): a user session
+
+    Raises:
+        Exception: the exception during generating welcome message
+
+    Returns:
+        list: message list
+    """
+    schema = req['schema']
+    if (bot := loader.bots.get(schema)) is None:
+        bot = await asyncio.to_thread(loader.get_bot, schema)
+    if bot is None:
+        raise ServiceException("unknown schema")
+
+    async with __hold_async(session):
+        _, reps = await bot.handle_message_async(0, None)
+        await sync_to_async(__commit)(session, {'schema': schema, **__state(bot, 0)})
+
+    now = round(time.time() * 1000)
+    return [{'content': r, 'time': now} for r in reps]
+
+
+async def message_async(session: SessionBase, req: dict) -> list:
+    """handle a message request on an event loop
+
+    The same as message, but the session lock is waited without blocking
+    the loop, the session is loaded and saved by django's sync adapter, and
+    the scripts are awaited (see BotModel.handle_message_async).
+
+    Args:
+        session (SessionBase): an user session
+        req (dict): a verified user request
+
+    Raises:
+        Exception: the exception during generating message to reply
+
+    Returns:
+        list: message list
+    """
+    async with __hold_async(session):
+        bot, stat = await sync_to_async(__restore)(session)
+        stat, reps = await bot.handle_message_async(stat, req['content'])
+        await sync_to_async(__commit)(session, __state(bot, stat))
+
+    now = round(time.time() * 1000)
+    return [{'content': r, 'time': now} for r in reps]
+
+
+async def messages_async(session: SessionBase, req: dict) -> list:
+    """handle several messages of a request in order on an event loop
+
+    The same as messages, as message_async is to message.
+
+    Args:
+        session (SessionBase): an user session
+        req (dict): a verified user request
+
+    Raises:
+        Exception: the exception during generating messages to reply
+
+    Returns:
+        list: message list of each message
+    """
+    async with __hold_async(session):
+        bot, stat = await sync_to_async(__restore)(session)
+        results = []
+        for msg in req['contents']:
+            stat, reps = await bot.handle_message_async(stat, msg)
+            results.append(reps)
+        await sync_to_async(__commit)(session, __state(bot, stat))
+
+    now = round(time.time() * 1000)
+    return [[{'content': r, 'time': now} for r in reps] for reps in results]
@@ -0,0 +1,141 @@
+"""the module to store built bot models next to their definitions
+
+Parsing a definition and building its model is done once. The built
+model (state table, node list, settings and the script module
+references) is written to an artifact beside the definition file,
+keyed by the hash of the definition source and of the model code.
+Later processes load the artifact instead, unless the source changed.
+
+Typical usage:
+key = artifact.digest_file(path)
+if (bot := artifact.load(path, key)) is None:
+    bot = build(path)
+    artifact.dump(path, key, bot)
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+import bot_service.service.model.bot as bot_module
+
+
+ARTIFACT_SUFFIX = 'c'  # script.def -> script.defc
+
+
+def __fingerprint() -> bytes:
+    """hash the model code, so artifacts built by other versions
+    of the model are never loaded
+    """
+    h = hashlib.sha256()
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(model_dir, name), 'rb') as f:
+                h.update(f.read())
+    return h.digest()
+
+
+__code_fingerprint = __fingerprint()
+
+
+def artifact_path(path: str) -> str:
+    """get the artifact path of a definition file
+
+    Args:
+        path (str): path of the definition
+
+    Returns:
+        str: path of the artifact
+    """
+    return path + ARTIFACT_SUFFIX
+
+
+def digest(source: bytes) -> str:
+    """hash a definition source
+
+    Args:
+        source (bytes): content of the definition file
+
+    Returns:
+        str: the key of the artifact
+    """
+    h = hashlib.sha256(__code_fingerprint)
+    h.update(source)
+    return h.hexdigest()
+
+
+def digest_file(path: str) -> str:
+    """hash a definition file chunk by chunk
+
+    Args:
+        path (str): path of the definition
+
+    Returns:
+        str: the key of the artifact
+    """
+    h = hashlib.sha256(__code_fingerprint)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 16):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load(path: str, key: str) -> bot_module.BotModel | None:
+    """try to load the artifact of a definition
+
+    Args:
+        path (str): path of the definition
+        key (str): digest of the definition source
+
+    Returns:
+        BotModel: the stored model
+        None: no artifact, or it is out of date
+    """
+    try:
+        with open(artifact_path(path), 'rb') as f:
+            stored = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.getLogger().warning(
+            "fail to load artifact of '%s': %s" % (path, e))
+        return None
+
+    if not isinstance(stored, dict) or stored.get('key') != key:
+        return None
+    return stored['model']
+
+
+def dump(path: str, key: str, bot: bot_module.BotModel) -> bool:
+    """store a built model beside its definition
+
+    The artifact is written to a temporary file first and then renamed,
+    so concurrent workers never read a partially written artifact.
+
+    Args:
+        path (str): path of the definition
+        key (str): digest of the definition source
+        bot (BotModel): the built model
+
+    Returns:
+        bool: whether the artifact is stored
+    """
+    target = artifact_path(path)
+    try:
+        fd, tmp = tempfile.mkstemp(
+            dir=os.path.dirname(target) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({'key': key, 'model': bot}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logging.getLogger().warning(
+            "fail to store artifact of '%s': %s" % (path, e))
+        return False
+    return True
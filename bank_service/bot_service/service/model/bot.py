@@ -11,13 +11,16 @@ script = load_script(f)
 bot = bot_module.BotModel()
 bot.build_model(script)
 """
-import importlib
-import inspect
-
 from enum import Enum, auto
+import hashlib
 import logging
+import sys
+
+from typing import Iterable
 
 from bot_service.service.model.exception import ConflictException
+from bot_service.service.model.faq import FaqIndex
+from bot_service.service.model.script import ScriptHandler
 
 
 class CommandEnum(Enum):
@@ -37,6 +40,7 @@ class CommandEnum(Enum):
 class BotNode:  # one service, one node
     """the node data structure to store information
     """
+    __slots__ = ('__query', '__faq_keyword', '__faq')
 
     def __init__(self) -> None:
         """init
@@ -45,14 +49,19 @@ class BotNode:  # one service, one node
         """
         self.__query = {}
         self.__faq_keyword = None
-        self.__faq: dict[str, str] = {}
+        self.__faq: FaqIndex | None = None  # created with the first item
 
     def set_query(self, type: CommandEnum, q: str, *args) -> None:
         """set query command for text and script
 
+        The handle of a script module can be a coroutine function, which
+        is awaited by BotModel.handle_message_async.
+
         Args:
             type (CommandEnum): type of the script
             q (str): text for query to response
+            args: the rest of the command, e.g. (tips, module, ttl, max
+            entries) for a waiting script with the cache clause
 
         Raises:
             ConflictException: text to be registered is already existed
@@ -63,23 +72,28 @@ class BotNode:  # one service, one node
             CommandEnum.ScriptWaiting
         }:
             raise Exception("illegal type of query.")
+        q = sys.intern(q)
         if q in self.__query:
             raise ConflictException("keyword '%s' has conflict." % q)
         elif type == CommandEnum.ScriptWaiting:
-            module = importlib.import_module(
-                '.' + args[1], 'bot_service.service.model.module')
-            if not inspect.isfunction(module.handle):
-                raise Exception("%s.handle is not a function." % args[2])
-            self.__query[q] = (type, args[0], module.handle)
+            self.__query[q] = (type, args[0], BotNode.__handler(*args[1:]))
         elif type == CommandEnum.Script:
-            module = importlib.import_module(
-                '.' + args[0], 'bot_service.service.model.module')
-            if not inspect.isfunction(module.handle):
-                raise Exception("%s.handle is not a function." % args[1])
-            self.__query[q] = (type, module.handle)
+            self.__query[q] = (type, BotNode.__handler(*args))
         else:
             self.__query[q] = (type, args[0])
 
+    @staticmethod
+    def __handler(module: str, ttl: str | None = None, size: str | None = None) -> ScriptHandler:
+        """create the handler of a script command
+
+        Args:
+            module (str): name of the script module
+            ttl (str | None, optional): the ttl of the cache clause
+            size (str | None, optional): the max entries of the cache clause
+        """
+        return ScriptHandler(module, None if ttl is None else float(ttl),
+                             None if size is None else int(size))
+
     def set_faq_keyword(self, s: str) -> None:
         """set the keyword to print the entire faq
 
@@ -100,7 +114,19 @@ class BotNode:  # one service, one node
             q (str): question
             a (str): answer
         """
-        self.__faq[q] = a
+        if self.__faq is None:
+            self.__faq = FaqIndex()
+        self.__faq.add(q, a)
+
+    def enable_faq_ranking(self, top_k: int, threshold: float) -> None:
+        """search faq by the ranked retrieval instead of substring matching
+
+        Args:
+            top_k (int): the maximum number of items in a reply
+            threshold (float): the minimum similarity of an item
+        """
+        if self.__faq is not None:
+            self.__faq.enable_ranking(top_k, threshold)
 
     def get_query(self, q: str) -> None | tuple:
         """try to get an anwser from the query list
@@ -120,14 +146,9 @@ class BotNode:  # one service, one node
         Returns:
             str: the faq string
         """
-        faq = ""
-        cnt = 0
-        for k, v in self.__faq.items():
-            cnt += 1
-            if cnt > 1:
-                faq += '\n'
-            faq += f"{cnt}. {k}\n{v}"
-        return faq
+        if self.__faq is None:
+            return ""
+        return self.__faq.dump()
 
     def get_all_query_keys(self) -> list[tuple[CommandEnum, str]]:
         """get keyword list of the query list
@@ -160,18 +181,9 @@ class BotNode:  # one service, one node
             str: merged string of result items
             None: no result found
         """
-        faq = ""
-        cnt = 0
-        for k, v in self.__faq.items():
-            cnt += 1
-            if q not in k:
-                continue
-            if cnt > 1:
-                faq += '\n'
-            faq += f"{cnt}. {k}\n{v}"
-        if len(faq.strip()) == 0:
+        if self.__faq is None:
             return None
-        return faq
+        return self.__faq.search(q)
 
 
 class BotModel:
@@ -188,13 +200,56 @@ class BotModel:
         Serv = 1
         Wait = 2
 
+    class ActionType(Enum):
+        """the enumerate class to describe the action of a transition
+        """
+        Reply = 0  # (Reply, next_stat, reply1, reply2, ...)
+        Script = 1  # (Script, next_stat, handler), reply what handler returns
+        FAQ = 2  # (FAQ, next_stat, node), reply the entire faq of node
+
+    class Stat:
+        """the record of a stat in automator
+
+        Root and Serv stats use prev (Serv only), wait, serv and menu.
+        Wait stats use token and cancel. wait and serv are only used
+        while building, then compiled into dispatch, mapping a message
+        to its action. A Wait stat calls fallback with any other message
+        as the argument. key identifies the stat across the rebuilds of
+        an edited definition, derived from the path of service names (and
+        the token of a Wait stat). It has fixed slots instead of a dict,
+        since a model may hold thousands of stats.
+        """
+        __slots__ = ('type', 'node', 'prev', 'wait', 'serv', 'token', 'cancel', 'menu',
+                     'dispatch', 'fallback', 'key')
+
+        def __init__(self, type: 'BotModel.StatType', node: int, prev: int = None,
+                     token: str = None, cancel: int = None, key: str = None) -> None:
+            self.type = type
+            self.key = key  # the path while building, then its digest
+            self.node = node  # index of the node in node list
+            self.prev = prev  # the stat to return to
+            self.token = token  # the query keyword of the waiting script
+            self.cancel = cancel  # the stat to go back to after waiting
+            self.menu: str | None = None  # the welcome message
+            self.dispatch: dict[str, tuple] = {}
+            self.fallback: tuple | None = None
+            if type == BotModel.StatType.Wait:
+                self.wait = None
+                self.serv = None
+            else:
+                self.wait: dict[str, int] = {}  # token -> stat of waiting
+                self.serv: dict[str, int] = {}  # name -> stat of service
+
     def __init__(self) -> None:
         """init
 
         It will define its private variables
         """
-        self.__stat_table: list[dict] = []
+        self.__stat_table: list[BotModel.Stat] = []
         self.__node_list: list[BotNode] = []
+        self.__greeting: str = ""  # the welcome message of the root
+        self.__stat_keys: dict[str, int] = {}  # key -> stat
+        self.__revision: str = ""  # the digest of all the keys in order
         # the default settings
         self.__setting: dict[str, str] = {
             'name': "Default Bot",
@@ -215,69 +270,70 @@ class BotModel:
             'error': "Unkown error"
         }
 
-    def build_model(self, script: list) -> bool:
+    def build_model(self, script: Iterable[tuple]) -> bool:
         """to parse the script and generate an automator of the bot
 
         Args:
-            script (list): the parsed script
+            script (Iterable[tuple]): the parsed script, or the iterator
+            of its top-level commands from a streaming parser
+
+        Raises:
+            AnalysisException: the streaming parser found errors
+
+        Returns:
+            bool: whether all the commands are built successfully
         """
 
         def load_setting(setting: list[tuple]):
             for (_, k, v), _ in setting:
                 self.__setting[k] = v
 
-        def recursive_build(command: tuple[tuple, list | None]):
+        def recursive_build(command: tuple[tuple, list | None], parent: int = None,
+                            path: str = ''):
             """the function to generate the transition table of the automator
 
             Args:
                 command (tuple[tuple, list): the root command of a low level
                 code block
+                parent (int, optional): the stat of the father service.
+                Defaults to None (the root).
+                path (str, optional): the service names from the root.
+                Defaults to '' (the root).
             """
             node = BotNode()
             self.__node_list.append(node)
             if command[0][0] == CommandEnum.Root:
-                self.__stat_table.append({
-                    'type': BotModel.StatType.Root,
-                    'node': len(self.__node_list) - 1,
-                    'wait': {},
-                    'serv': {}
-                })
+                stat = BotModel.Stat(BotModel.StatType.Root, len(self.__node_list) - 1,
+                                     key=path)
             else:
-                self.__stat_table.append({
-                    'type': BotModel.StatType.Serv,
-                    'node': len(self.__node_list) - 1,
-                    'prev': len(self.__stat_table) - 1,
-                    'wait': {},
-                    'serv': {}
-                })
+                stat = BotModel.Stat(BotModel.StatType.Serv, len(self.__node_list) - 1,
+                                     prev=parent, key=path)
+            self.__stat_table.append(stat)
             prev = len(self.__stat_table) - 1
             prev_node = len(self.__node_list) - 1
 
-            for elem in command[1]:
+            for elem in command[1] or ():  # a service may have no sub-block
                 elem: tuple[CommandEnum, list | None]
                 try:
                     if elem[0][0] == CommandEnum.Setting:
                         load_setting(elem[1])
                     elif elem[0][0] == CommandEnum.Service:
-                        last = len(self.__stat_table) - 1
-                        recursive_build(elem)
-                        servs = self.__stat_table[prev]['serv']
-                        if elem[0][1] in servs:
+                        name = sys.intern(elem[0][1])
+                        if name in stat.serv:
                             logging.getLogger().warn("conflict in service names.")
-                        servs[elem[0][1]] = last + 1
+                        stat.serv[name] = len(self.__stat_table)
+                        recursive_build(elem, prev, path + '\0' + name)
                     elif elem[0][0] == CommandEnum.ScriptWaiting:
-                        self.__stat_table.append({
-                            'type': BotModel.StatType.Wait,
-                            'node': prev_node,
-                            'token': elem[0][1],
-                            'cancel': prev
-                        })
-                        self.__stat_table[prev]['wait'][elem[0][1]] = prev + 1
                         node.set_query(CommandEnum.ScriptWaiting,
-                                       elem[0][1], elem[0][2], elem[0][3])
+                                       elem[0][1], *elem[0][2:])
+                        token = sys.intern(elem[0][1])
+                        self.__stat_table.append(BotModel.Stat(
+                            BotModel.StatType.Wait, prev_node,
+                            token=token, cancel=prev, key=path + '\0\0' + token))
+                        stat.wait[token] = len(self.__stat_table) - 1
                     elif elem[0][0] == CommandEnum.Script:
                         node.set_query(CommandEnum.Script,
-                                       elem[0][1], elem[0][2])
+                                       elem[0][1], *elem[0][2:])
                     elif elem[0][0] == CommandEnum.Text:
                         node.set_query(CommandEnum.Text,
                                        elem[0][1], elem[0][2])
@@ -292,38 +348,53 @@ class BotModel:
 
         success = True
         recursive_build(((CommandEnum.Root, ), script))
+        try:
+            self.__setup_faq()
+        except Exception as e:
+            success = False
+            logging.getLogger().warn(e)
+        self.__render_menus()
+        self.__compile_dispatch()
+        self.__assign_keys()
         return success
 
-    def get_settings(self) -> dict[str, str]:
-        """get all the settings
+    def __assign_keys(self) -> None:
+        """replace the path of each stat by its digest, as its key
 
-        Returns:
-            dict[str, str]: the settings defined in the definition file
+        The stats of the same path (conflicting service names) are told
+        apart by their order.
         """
-        return self.__setting.copy()
-
-    def handle_message(self, stat: int, msg: str = None) -> tuple[int, list[str]]:
-        """handling an user message to generate the response and next stat
-
-        Args:
-            stat (int): the user's stat now
-            msg (str, optional): user's message. Defaults to None (means root).
-
-        Returns:
-            tuple[int, list[str]]: (next_stat, [reply1, reply2, ...])
+        revision = hashlib.blake2b(digest_size=16)
+        for i, stat in enumerate(self.__stat_table):
+            path, n = stat.key, 0
+            key = hashlib.blake2b(path.encode(), digest_size=8).hexdigest()
+            while key in self.__stat_keys:
+                n += 1
+                key = hashlib.blake2b(('%s\0%d' % (path, n)).encode(),
+                                      digest_size=8).hexdigest()
+            stat.key = key
+            self.__stat_keys[key] = i
+            revision.update(key.encode())
+        self.__revision = revision.hexdigest()
+
+    def __render_menus(self) -> None:
+        """render the welcome message of every service and the root
+
+        The messages are fully determined by the model, so they are
+        generated once after building, and stored in the stat table.
         """
         def enter_node(stat: int, node: BotNode) -> str:
             """generate the welcome message of entering a service or the root
 
             Args:
-                stat (int): the user's stat now
+                stat (int): the stat of the service
                 node (BotNode): the node (service or root) to enter
 
             Returns:
                 str: welcome message
             """
             reply = self.__setting['welcome'] + '\n'
-            service = list(self.__stat_table[stat]['serv'].keys())
+            service = list(self.__stat_table[stat].serv.keys())
             question = []
             for _, k in node.get_all_query_keys():
                 question.append(k)
@@ -336,67 +407,285 @@ class BotModel:
             reply += self.__setting['other']
             return reply
 
+        for stat, stat_properties in enumerate(self.__stat_table):
+            if stat_properties.type != BotModel.StatType.Wait:
+                node = self.__node_list[stat_properties.node]
+                stat_properties.menu = enter_node(stat, node)
+        self.__greeting = self.__stat_table[0].menu + '\n' + self.__setting['back_info']
+
+    def __compile_dispatch(self) -> None:
+        """compile the transitions of every stat into a single dict
+
+        A message of a known transition then takes one lookup. The
+        precedence is back, sub-services, waiting scripts, options
+        (text and script) and the faq keyword. A keyword shadowed by
+        another one of higher precedence is reported here.
+        """
+        logger = logging.getLogger()
+        table = self.__stat_table
+        names = ['root'] * len(table)
+        actions: dict[tuple, tuple] = {}  # identical actions are shared
+        waits: dict[int, dict] = {}  # so are the dispatch of Wait stats
+
+        for stat, stat_properties in enumerate(table):
+            node = self.__node_list[stat_properties.node]
+            dispatch: dict[str, tuple] = {}
+            kinds: dict[str, str] = {}
+
+            def register(msg: str, kind: str, action: tuple) -> None:
+                if msg in dispatch:
+                    logger.warning("%s '%s' in service '%s' is shadowed by %s." % (
+                        kinds[msg], msg, names[stat], kind))
+                dispatch[msg] = actions.setdefault(action, action)
+                kinds[msg] = kind
+
+            if stat_properties.type == BotModel.StatType.Wait:
+                cancel = stat_properties.cancel
+                if cancel not in waits:
+                    register(self.__setting['cancel'], 'cancel', (
+                        BotModel.ActionType.Reply, cancel, self.__setting['cancel_success']))
+                    waits[cancel] = dispatch
+                handler = node.get_query(stat_properties.token)[2]
+                stat_properties.fallback = (BotModel.ActionType.Script, cancel, handler)
+                stat_properties.dispatch = waits[cancel]
+                continue
+
+            if (faq_kw := node.get_faq_keyword()) is not None:
+                register(faq_kw, 'faq', (BotModel.ActionType.FAQ, stat, node))
+            for type, q in node.get_all_query_keys():
+                query = node.get_query(q)
+                if type == CommandEnum.Text:
+                    register(q, 'option', (BotModel.ActionType.Reply, stat, query[1]))
+                elif type == CommandEnum.Script:
+                    register(q, 'option', (BotModel.ActionType.Script, stat, query[1]))
+            for token, wait in stat_properties.wait.items():
+                register(token, 'waiting script', (
+                    BotModel.ActionType.Reply, wait,
+                    node.get_query(token)[1] + '\n', self.__setting['cancel_info']))
+            for name, serv in stat_properties.serv.items():
+                names[serv] = name
+                register(name, 'sub-service', (
+                    BotModel.ActionType.Reply, serv, table[serv].menu))
+            if stat_properties.type == BotModel.StatType.Serv:
+                prev = stat_properties.prev
+                register(self.__setting['back'], 'back', (
+                    BotModel.ActionType.Reply, prev,
+                    self.__setting['back_success'], table[prev].menu))
+
+            stat_properties.dispatch = dispatch
+            stat_properties.wait = None
+            stat_properties.serv = None
+
+    def __setup_faq(self) -> None:
+        """set up the faq search of all the nodes by the settings
+
+        'faq_mode' is 'match' (default) to reply the items containing the
+        message, or 'rank' to reply the 'faq_top_k' (default 3) most
+        similar items, whose similarity is at least 'faq_threshold'
+        (default 0.2).
+
+        Raises:
+            Exception: illegal settings
+        """
+        mode = self.__setting.get('faq_mode', 'match')
+        if mode == 'match':
+            return
+        if mode != 'rank':
+            raise Exception("unknown faq mode '%s'." % mode)
+        top_k = int(self.__setting.get('faq_top_k', '3'))
+        threshold = float(self.__setting.get('faq_threshold', '0.2'))
+        for node in self.__node_list:
+            node.enable_faq_ranking(top_k, threshold)
+
+    def get_settings(self) -> dict[str, str]:
+        """get all the settings
+
+        Returns:
+            dict[str, str]: the settings defined in the definition file
+        """
+        return self.__setting.copy()
+
+    def get_revision(self) -> str:
+        """get the revision of the stats
+
+        Two models have the same revision if and only if their stats
+        (thus the stats of the sessions) are the same.
+
+        Returns:
+            str: the revision
+        """
+        return self.__revision
+
+    def get_stat_key(self, stat: int) -> str:
+        """get the key of a stat, stable across the rebuilds
+
+        Args:
+            stat (int): the stat
+
+        Returns:
+            str: the key
+        """
+        return self.__stat_table[stat].key
+
+    def find_stat(self, key: str) -> int | None:
+        """find a stat by its key
+
+        A session keeping the key of its stat (see get_stat_key) gets the
+        same stat from any model of the definition, built from any of its
+        revisions, unless the stat was removed.
+
+        Args:
+            key (str): the key
+
+        Returns:
+            int: the stat
+            None: no such stat
+        """
+        return self.__stat_keys.get(key)
+
+    def get_script_stats(self) -> list[dict[str, int | str]]:
+        """get the counters of all the script handlers
+
+        Returns:
+            list[dict[str, int | str]]: the option and the counters of each
+            script (see ScriptHandler.stats)
+        """
+        stats = []
+        for node in self.__node_list:
+            for type, q in node.get_all_query_keys():
+                if type != CommandEnum.Text:
+                    stats.append({'option': q} | node.get_query(q)[-1].stats())
+        return stats
+
+    def __route(self, stat: int, msg: str | None) -> tuple[tuple, tuple]:
+        """find the action to perform for an user message
+
+        The replies not coming from the dispatch dict (greeting, faq
+        search and unknown) are wrapped in a reply action.
+
+        Args:
+            stat (int): the user's stat now
+            msg (str | None): user's message
+
+        Returns:
+            tuple[tuple, tuple]: (action, args of the script)
+        """
         if msg is None and stat == 0:  # root
-            return (stat, [enter_node(stat, self.__node_list[0]) + '\n' + self.__setting['back_info']])
+            return ((BotModel.ActionType.Reply, stat, self.__greeting), ())
 
-        replies = []
         stat_properties = self.__stat_table[stat]
-        type = stat_properties['type']
-        match type:
-            case BotModel.StatType.Wait:
-                if msg == self.__setting['cancel']:
-                    replies.append(self.__setting['cancel_success'])
-
-                    stat = stat_properties['cancel']
-                else:
-                    arg = msg  # the msg is an argument
-
-                    token = stat_properties['token']
-                    node = self.__node_list[stat_properties['node']]
-                    handle = node.get_query(token)[2]
-                    try:
-                        reply = handle(arg)
-                    except:
-                        reply = self.__setting['unkown']
-                    stat = stat_properties['cancel']
-                    replies.append(reply)
-            case BotModel.StatType.Serv | BotModel.StatType.Root:
-                if type == BotModel.StatType.Serv and msg == self.__setting['back']:
-                    replies.append(self.__setting['back_success'])
-
-                    stat = stat_properties['prev']
-                    stat_properties = self.__stat_table[stat]
-                    node = self.__node_list[stat_properties['node']]
-
-                    replies.append(enter_node(stat, node))
-                else:
-                    node = self.__node_list[stat_properties['node']]
-                    if msg in stat_properties['serv']:
-                        stat = stat_properties['serv'][msg]
-                        stat_properties = self.__stat_table[stat]
-                        next_node = self.__node_list[stat_properties['node']]
-
-                        replies.append(enter_node(stat, next_node))
-                    elif msg in stat_properties['wait']:
-                        replies.append(node.get_query(msg)[1] + '\n')
-                        replies.append(self.__setting['cancel_info'])
-
-                        stat = stat_properties['wait'][msg]
-                    elif (query := node.get_query(msg)) is not None:
-                        match query[0]:
-                            case CommandEnum.Text:
-                                replies.append(query[1])
-                            case CommandEnum.Script:
-                                handle = query[1]
-                                try:
-                                    reply = handle()
-                                except:
-                                    reply = self.__setting['error']
-                                replies.append(reply)
-                    elif msg == node.get_faq_keyword():
-                        replies.append(node.get_all_faq())
-                    elif (faq := node.search_faq(msg)) is not None:
-                        replies.append(faq)
-                    else:
-                        replies.append(self.__setting['unknown'])
-        return (stat, replies)
+        if (action := stat_properties.dispatch.get(msg)) is not None:
+            return (action, ())
+        if (action := stat_properties.fallback) is not None:
+            return (action, (msg, ))  # the msg is an argument
+
+        # search faq
+        node = self.__node_list[stat_properties.node]
+        if (faq := node.search_faq(msg)) is None:
+            faq = self.__setting['unknown']
+        return ((BotModel.ActionType.Reply, stat, faq), ())
+
+    def handle_message(self, stat: int, msg: str = None) -> tuple[int, list[str]]:
+        """handling an user message to generate the response and next stat
+
+        Args:
+            stat (int): the user's stat now
+            msg (str, optional): user's message. Defaults to None (means root).
+
+        Returns:
+            tuple[int, list[str]]: (next_stat, [reply1, reply2, ...])
+        """
+        action, args = self.__route(stat, msg)
+        match action[0]:
+            case BotModel.ActionType.Reply:
+                return (action[1], list(action[2:]))
+            case BotModel.ActionType.Script:
+                try:
+                    reply = action[2](*args)
+                except:
+                    reply = self.__setting['error']
+                return (action[1], [reply])
+            case BotModel.ActionType.FAQ:
+                return (action[1], [action[2].get_all_faq()])
+
+    async def handle_message_async(self, stat: int, msg: str = None) -> tuple[int, list[str]]:
+        """handling an user message on an event loop
+
+        It gives the same result as handle_message, but the script
+        handlers are awaited (see ScriptHandler.call_async), so a slow
+        handler does not block the other conversations.
+
+        Args:
+            stat (int): the user's stat now
+            msg (str, optional): user's message. Defaults to None (means root).
+
+        Returns:
+            tuple[int, list[str]]: (next_stat, [reply1, reply2, ...])
+        """
+        action, args = self.__route(stat, msg)
+        match action[0]:
+            case BotModel.ActionType.Reply:
+                return (action[1], list(action[2:]))
+            case BotModel.ActionType.Script:
+                try:
+                    reply = await action[2].call_async(*args)
+                except:
+                    reply = self.__setting['error']
+                return (action[1], [reply])
+            case BotModel.ActionType.FAQ:
+                return (action[1], [action[2].get_all_faq()])
+
+    def handle_messages(self, pairs: Iterable[tuple[int, str | None]]) -> list[tuple[int, list[str]]]:
+        """handling a batch of user messages, e.g. replaying logged messages
+
+        It gives the same results as calling handle_message for each pair,
+        with less overhead per message.
+
+        Args:
+            pairs (Iterable[tuple[int, str | None]]): (stat, msg) pairs
+
+        Returns:
+            list[tuple[int, list[str]]]: (next_stat, [reply1, reply2, ...])
+            of each pair
+        """
+        table = self.__stat_table
+        handle_message = self.handle_message
+        reply = BotModel.ActionType.Reply
+        results = []
+        append = results.append
+        for stat, msg in pairs:
+            action = table[stat].dispatch.get(msg)
+            if action is not None and action[0] is reply:
+                append((action[1], list(action[2:])))
+            else:
+                append(handle_message(stat, msg))
+        return results
+
+    def handle_conversation(self, msgs: Iterable[str | None], stat: int = 0) -> list[tuple[int, list[str]]]:
+        """handling the messages of a conversation one after another
+
+        The next stat of each message is the stat of the following one.
+
+        Args:
+            msgs (Iterable[str | None]): user's messages
+            stat (int, optional): the stat before the conversation.
+            Defaults to 0 (the root).
+
+        Returns:
+            list[tuple[int, list[str]]]: (next_stat, [reply1, reply2, ...])
+            of each message
+        """
+        table = self.__stat_table
+        handle_message = self.handle_message
+        reply = BotModel.ActionType.Reply
+        results = []
+        append = results.append
+        for msg in msgs:
+            action = table[stat].dispatch.get(msg)
+            if action is not None and action[0] is reply:
+                result = (action[1], list(action[2:]))
+            else:
+                result = handle_message(stat, msg)
+            append(result)
+            stat = result[0]
+        return results
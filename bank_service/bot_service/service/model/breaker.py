@@ -0,0 +1,145 @@
+"""the module to stop calling a failing handler for a while
+
+A handler failing again and again (e.g. its backend service is down)
+makes every user wait for the failure. The circuit breaker of a handler
+opens after `threshold` failures within `window` seconds. While open,
+the handler is not called and the last good reply of the same arguments
+is used instead. After `cooldown` seconds, one call is let through as a
+probe (half-open): the circuit closes if it succeeds, or opens again.
+
+Typical usage:
+breaker = CircuitBreaker('check')
+if not breaker.allow():
+    return breaker.fallback(args)
+try:
+    reply = handler(*args)
+except Exception:
+    breaker.fail()
+    raise
+breaker.succeed(args, reply)
+"""
+import logging
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+from bot_service.service.model.exception import CircuitOpenException
+
+
+class CircuitBreaker:
+    """the circuit breaker of a handler
+
+    The thresholds are shared by all the breakers, and can be changed
+    by the settings.
+
+    Attributes:
+        threshold (int | None): failures to open the circuit, None to
+        never open
+        window (float): seconds to count the failures
+        cooldown (float): seconds before probing an open circuit
+        replies (int): max number of the last good replies kept
+    """
+
+    threshold: int | None = 5
+    window: float = 60
+    cooldown: float = 30
+    replies: int = 128
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str) -> None:
+        """init
+
+        Args:
+            name (str): name of the handler, for logging
+        """
+        self.name = name
+        self.state = CircuitBreaker.CLOSED
+        self.__failures: deque[float] = deque()
+        self.__opened = 0.0
+        self.__probing = False
+        self.__replies: OrderedDict[tuple, str] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __transit(self, state: str) -> None:
+        self.state = state
+        if state == CircuitBreaker.OPEN:
+            logging.getLogger().warn("circuit of script '%s' is open." % self.name)
+        else:
+            logging.getLogger().info("circuit of script '%s' is %s." % (self.name, state))
+
+    def allow(self) -> bool:
+        """check if the handler can be called now
+
+        Returns:
+            bool: True if closed, or as the probe of half-open
+        """
+        with self.__lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN:
+                if time.monotonic() - self.__opened < CircuitBreaker.cooldown:
+                    return False
+                self.__transit(CircuitBreaker.HALF_OPEN)
+            if self.__probing:
+                return False
+            self.__probing = True
+            return True
+
+    def succeed(self, args: tuple, reply: str) -> None:
+        """record a successful call
+
+        Args:
+            args (tuple): arguments of the call
+            reply (str): the reply
+        """
+        with self.__lock:
+            self.__replies[args] = reply
+            self.__replies.move_to_end(args)
+            if len(self.__replies) > CircuitBreaker.replies:
+                self.__replies.popitem(last=False)
+            self.__failures.clear()
+            if self.state != CircuitBreaker.CLOSED:
+                self.__probing = False
+                self.__transit(CircuitBreaker.CLOSED)
+
+    def fail(self) -> None:
+        """record a failed call
+        """
+        with self.__lock:
+            now = time.monotonic()
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self.__probing = False
+                self.__opened = now
+                self.__transit(CircuitBreaker.OPEN)
+                return
+            if CircuitBreaker.threshold is None:
+                return
+            failures = self.__failures
+            failures.append(now)
+            while failures[0] <= now - CircuitBreaker.window:
+                failures.popleft()
+            if len(failures) >= CircuitBreaker.threshold and self.state == CircuitBreaker.CLOSED:
+                failures.clear()
+                self.__opened = now
+                self.__transit(CircuitBreaker.OPEN)
+
+    def fallback(self, args: tuple) -> str:
+        """get the reply of a call not allowed
+
+        Args:
+            args (tuple): arguments of the call
+
+        Raises:
+            CircuitOpenException: no good reply of the arguments
+
+        Returns:
+            str: the last good reply of the arguments
+        """
+        with self.__lock:
+            if (reply := self.__replies.get(args)) is None:
+                raise CircuitOpenException("circuit of script '%s' is open." % self.name)
+            return reply
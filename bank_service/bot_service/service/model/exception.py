@@ -4,5 +4,20 @@ class ConflictException(Exception):
 
 
 class ServiceException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class AnalysisException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class RejectedException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class CircuitOpenException(Exception):
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
\ No newline at end of file
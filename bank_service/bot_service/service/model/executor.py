@@ -0,0 +1,186 @@
+"""the module to run script handlers on a bounded pool
+
+The handlers of script modules are user code, which may be slow or never
+return. Running them on a pool with a timeout keeps the request workers
+available: a call waiting longer than the timeout fails immediately, and
+when all the workers are busy and the queue is full, new calls are
+rejected instead of piling up.
+
+A thread pool shares the memory of the service, but a runaway handler
+keeps its worker (and its slot of the queue) until it returns. A process
+pool isolates the handlers, at the cost of pickling the arguments and
+replies.
+
+Typical usage:
+executor = ScriptExecutor('thread', workers=8, queue=64, timeout=5)
+reply = executor.run(handler, msg)
+print(executor.stats())
+"""
+import asyncio
+import concurrent.futures
+import threading
+
+from typing import Awaitable, Callable
+
+from bot_service.service.model.exception import RejectedException
+
+
+class ScriptExecutor:
+    """the pool to run script handlers with a timeout
+    """
+
+    def __init__(self, pool: str = 'thread', workers: int = 8, queue: int = 64,
+                 timeout: float | None = 5) -> None:
+        """init
+
+        Args:
+            pool (str, optional): 'thread' or 'process'. Defaults to 'thread'.
+            workers (int, optional): number of workers. Defaults to 8.
+            queue (int, optional): number of calls allowed to wait for a
+            worker. Defaults to 64.
+            timeout (float | None, optional): seconds to wait for a reply,
+            None for no limit. Defaults to 5.
+
+        Raises:
+            Exception: unknown type of pool
+        """
+        if pool == 'thread':
+            self.__pool = concurrent.futures.ThreadPoolExecutor(
+                workers, thread_name_prefix='script')
+        elif pool == 'process':
+            self.__pool = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            raise Exception("unknown type of pool '%s'." % pool)
+        self.pool = pool
+        self.workers = workers
+        self.timeout = timeout
+        self.__slots = threading.BoundedSemaphore(workers + queue)
+        self.__lock = threading.Lock()
+        self.__pending = 0  # submitted, not finished
+        self.__completed = 0
+        self.__failed = 0
+        self.__timeouts = 0
+        self.__rejected = 0
+
+    def __submit(self, fn: Callable, args: tuple) -> concurrent.futures.Future:
+        """submit a call, taking a slot until it finishes
+
+        Raises:
+            RejectedException: the queue is full
+        """
+        if not self.__slots.acquire(blocking=False):
+            with self.__lock:
+                self.__rejected += 1
+            raise RejectedException("script queue is full.")
+        with self.__lock:
+            self.__pending += 1
+        try:
+            future = self.__pool.submit(fn, *args)
+        except:
+            self.__done(None)
+            raise
+        future.add_done_callback(self.__done)
+        return future
+
+    def __done(self, future: concurrent.futures.Future | None) -> None:
+        with self.__lock:
+            self.__pending -= 1
+            if future is None or future.cancelled():
+                pass
+            elif future.exception() is None:
+                self.__completed += 1
+            else:
+                self.__failed += 1
+        self.__slots.release()
+
+    def __timeout(self, future: concurrent.futures.Future) -> None:
+        future.cancel()  # still in the queue, never started
+        with self.__lock:
+            self.__timeouts += 1
+
+    def run(self, fn: Callable, *args) -> str:
+        """run a handler on the pool, blocking until it returns
+
+        Args:
+            fn (Callable): the handler, picklable for a process pool
+
+        Raises:
+            RejectedException: the queue is full
+            TimeoutError: the handler did not return in time
+
+        Returns:
+            str: the reply
+        """
+        future = self.__submit(fn, args)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            self.__timeout(future)
+            raise
+
+    async def run_async(self, fn: Callable, *args) -> str:
+        """run a handler on the pool without blocking the event loop
+
+        Args:
+            fn (Callable): the handler, picklable for a process pool
+
+        Raises:
+            RejectedException: the queue is full
+            TimeoutError: the handler did not return in time
+
+        Returns:
+            str: the reply
+        """
+        future = self.__submit(fn, args)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), self.timeout)
+        except TimeoutError:
+            self.__timeout(future)
+            raise
+
+    async def wait(self, aw: Awaitable[str]) -> str:
+        """await an async handler within the timeout
+
+        The handler runs on the event loop instead of the pool.
+
+        Args:
+            aw (Awaitable[str]): the call of the handler
+
+        Raises:
+            TimeoutError: the handler did not return in time
+
+        Returns:
+            str: the reply
+        """
+        try:
+            return await asyncio.wait_for(aw, self.timeout)
+        except TimeoutError:
+            with self.__lock:
+                self.__timeouts += 1
+            raise
+
+    def stats(self) -> dict[str, int | str]:
+        """get the counters of the pool
+
+        Returns:
+            dict[str, int | str]: pool, workers, queued (waiting for a
+            worker), running, completed, failed, timeouts and rejected
+        """
+        with self.__lock:
+            running = min(self.__pending, self.workers)
+            return {
+                'pool': self.pool,
+                'workers': self.workers,
+                'queued': self.__pending - running,
+                'running': running,
+                'completed': self.__completed,
+                'failed': self.__failed,
+                'timeouts': self.__timeouts,
+                'rejected': self.__rejected
+            }
+
+    def shutdown(self) -> None:
+        """stop the pool, dropping the queued calls
+        """
+        self.__pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,263 @@
+"""the faq storage of a bot node
+
+Questions are indexed by their character n-grams (unigrams and
+bigrams), which works for Chinese questions without a segmenter.
+A search only verifies the questions sharing the rarest n-gram of
+the message, instead of scanning every question.
+
+Optionally, the faq can be switched to the ranked retrieval. The
+questions are then represented as a sparse TF-IDF matrix of their
+character bigrams, stored column by column (one posting array per
+bigram). A search multiplies it with the vector of the message in one
+batch, touching only the columns of the bigrams in the message, and
+returns the top-k questions by cosine similarity. In a large faq, the
+bigrams in most of the questions (e.g. "th" or "e " of english
+questions) are left out as stop features: they weigh little, but their
+columns would be most of the cost of a search.
+
+Typical usage:
+faq = FaqIndex()
+faq.add("question", "answer")
+reply = faq.search("quest")
+
+faq.enable_ranking(3, 0.2)
+reply = faq.search("how to ask a question")
+"""
+import math
+
+import numpy as np
+
+
+class FaqIndex:
+    """the faq items with a character n-gram inverted index
+    """
+    GRAM = 2  # the longest n-gram indexed
+    # a bigram in more than STOP_RATIO of the questions (and more than
+    # STOP_MIN questions) is not a feature of the ranked retrieval
+    STOP_RATIO = 0.05
+    STOP_MIN = 1000
+
+    def __init__(self) -> None:
+        """init
+
+        It will define its private variables
+        """
+        self.__ids: dict[str, int] = {}
+        self.__questions: list[str] = []
+        self.__answers: list[str] = []
+        self.__postings: dict[str, list[int]] = {}
+        # the ranked retrieval, set up by enable_ranking
+        self.__ranking: tuple[int, float] | None = None
+        # (columns, indptr, indices, weights, inv_norms), None if out of date
+        self.__matrix: tuple[dict[str, int], np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self.__questions)
+
+    @staticmethod
+    def grams(s: str) -> set[str]:
+        """get all the n-grams of a string, n from 1 to GRAM
+
+        Args:
+            s (str): the string
+
+        Returns:
+            set[str]: the n-grams
+        """
+        grams = set()
+        for n in range(1, FaqIndex.GRAM + 1):
+            for i in range(len(s) - n + 1):
+                grams.add(s[i:i + n])
+        return grams
+
+    @staticmethod
+    def features(s: str) -> set[str]:
+        """get the features of a string for the ranked retrieval
+
+        They are the character bigrams of the lowercased string, padded
+        with a space at both ends, so a single character still has
+        features.
+
+        Args:
+            s (str): the string
+
+        Returns:
+            set[str]: the features
+        """
+        s = f" {s.lower()} "
+        return {s[i:i + 2] for i in range(len(s) - 1)}
+
+    def add(self, q: str, a: str) -> None:
+        """add an item, or replace the answer of an existing question
+
+        Args:
+            q (str): question
+            a (str): answer
+        """
+        if (i := self.__ids.get(q)) is not None:
+            self.__answers[i] = a
+            return
+        i = len(self.__questions)
+        self.__ids[q] = i
+        self.__questions.append(q)
+        self.__answers.append(a)
+        for g in FaqIndex.grams(q):
+            self.__postings.setdefault(g, []).append(i)
+        self.__matrix = None  # rebuilt by the next rank
+
+    def match(self, q: str) -> list[int]:
+        """find the questions containing a string
+
+        Args:
+            q (str): the string to search
+
+        Returns:
+            list[int]: ids of the matched questions in ascending order
+        """
+        if len(q) == 0:
+            return list(range(len(self.__questions)))
+        n = min(len(q), FaqIndex.GRAM)
+        candidates = None
+        for i in range(len(q) - n + 1):
+            posting = self.__postings.get(q[i:i + n])
+            if posting is None:
+                return []
+            if candidates is None or len(posting) < len(candidates):
+                candidates = posting
+        questions = self.__questions
+        return [i for i in candidates if q in questions[i]]
+
+    def enable_ranking(self, top_k: int, threshold: float) -> None:
+        """switch search to the ranked retrieval
+
+        The TF-IDF weights of all the questions are computed here, and
+        again by the next rank after items are added.
+
+        Args:
+            top_k (int): the maximum number of items in a reply
+            threshold (float): the minimum cosine similarity of an item
+        """
+        if top_k <= 0:
+            raise ValueError("top-k should be positive.")
+        self.__ranking = (top_k, threshold)
+        self.__matrix = self.__build()
+
+    def __build(self) -> tuple[dict[str, int], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """compute the TF-IDF matrix of all the questions
+        """
+        postings: dict[str, list[int]] = {}
+        for i, q in enumerate(self.__questions):
+            for f in FaqIndex.features(q):
+                postings.setdefault(f, []).append(i)
+
+        total = len(self.__questions)
+        stop = max(FaqIndex.STOP_MIN, FaqIndex.STOP_RATIO * total)
+        columns = {}
+        indptr = [0]
+        indices = []
+        weights = []
+        for f, ids in postings.items():
+            if len(ids) > stop:
+                continue
+            columns[f] = len(weights)
+            indices.extend(ids)
+            indptr.append(len(indices))
+            idf = math.log((total + 1) / (len(ids) + 1)) + 1
+            weights.append(idf * idf)
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int64)
+        weights = np.array(weights, dtype=np.float64)
+
+        # a question of stop features only is never similar (zero norm)
+        sqnorms = np.bincount(
+            indices, weights=np.repeat(weights, np.diff(indptr)), minlength=total)
+        inv_norms = np.zeros(total)
+        np.divide(1, np.sqrt(sqnorms), out=inv_norms, where=sqnorms > 0)
+        return columns, indptr, indices, weights, inv_norms
+
+    def rank(self, q: str) -> list[int]:
+        """find the questions most similar to a string
+
+        Args:
+            q (str): the string to search
+
+        Returns:
+            list[int]: ids of at most top-k questions above the threshold,
+            the most similar first
+        """
+        top_k, threshold = self.__ranking
+        if (matrix := self.__matrix) is None:  # items added since built
+            matrix = self.__matrix = self.__build()
+        columns, indptr, indices, weights, inv_norms = matrix
+        cols = [c for f in FaqIndex.features(q) if (c := columns.get(f)) is not None]
+        if len(cols) == 0:
+            return []
+
+        cols = np.array(cols, dtype=np.int64)
+        starts = indptr[cols]
+        ends = indptr[cols + 1]
+        ids = np.concatenate([indices[b:e] for b, e in zip(starts, ends)])
+        weights = weights[cols]
+
+        # cosine similarities of all the questions, zero for the untouched
+        scores = np.bincount(
+            ids, weights=np.repeat(weights, ends - starts),
+            minlength=len(self.__questions))
+        scores *= inv_norms
+        scores /= math.sqrt(weights.sum())
+
+        top = np.flatnonzero(scores >= max(threshold, np.finfo(scores.dtype).tiny))
+        if len(top) > top_k:
+            top = top[np.argpartition(scores[top], -top_k)[-top_k:]]
+        top = top[np.lexsort((top, -scores[top]))]  # the most similar first
+        return top.tolist()
+
+    def format(self, ids: list[int]) -> str:
+        """merge items to a string, numbered by their position in faq
+
+        Args:
+            ids (list[int]): ids of the items in ascending order
+
+        Returns:
+            str: the merged string
+        """
+        questions = self.__questions
+        answers = self.__answers
+        items = []
+        for i in ids:
+            if i > 0:  # items are separated as in the entire faq
+                items.append('\n')
+            items.append(f"{i + 1}. {questions[i]}\n{answers[i]}")
+        return ''.join(items)
+
+    def dump(self) -> str:
+        """get the merged entire faq as a string
+
+        Returns:
+            str: the faq string
+        """
+        return self.format(range(len(self.__questions)))
+
+    def search(self, q: str) -> str | None:
+        """search a question in faq
+
+        Args:
+            q (str): question
+
+        Returns:
+            str: merged string of result items
+            None: no result found
+        """
+        if self.__ranking is not None:
+            ids = self.rank(q)
+            if len(ids) == 0:
+                return None
+            return '\n'.join([
+                f"{i + 1}. {self.__questions[i]}\n{self.__answers[i]}"
+                for i in ids
+            ])
+
+        ids = self.match(q)
+        if len(ids) == 0:
+            return None
+        return self.format(ids)
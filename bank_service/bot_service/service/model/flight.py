@@ -0,0 +1,146 @@
+"""the module to coalesce identical concurrent calls
+
+When many users send the same message at once, the same handler is
+called with the same arguments many times in parallel. A single flight
+runs only the first of the identical calls in progress, and the others
+wait for its result (or its exception) instead of calling again.
+
+Typical usage:
+flights = SingleFlight()
+reply = flights.do(('check', msg), handler, msg)
+
+or, on an event loop:
+reply = await flights.do_async(('check', msg), handler.call_async, msg)
+"""
+import asyncio
+import threading
+
+from typing import Awaitable, Callable, Hashable
+
+
+CANCELLED = object()  # the result of a call whose leader was cancelled
+
+class Flight:
+    """a call in progress, waited by the identical calls
+    """
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """the table of the calls in progress
+
+    Attributes:
+        coalesced (int): number of the calls served by another one
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self.__lock = threading.Lock()
+        self.__flights: dict[Hashable, Flight] = {}
+        self.__futures: dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable, *args):
+        """call a function unless an identical call is in progress
+
+        Args:
+            key (Hashable): the identity of the call
+            fn (Callable): the function
+
+        Raises:
+            Exception: the exception raised by the call
+
+        Returns:
+            the result of the call
+        """
+        with self.__lock:
+            if (flight := self.__flights.get(key)) is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self.__flights[key] = Flight()
+                leader = True
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+            flight.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable], *args):
+        """await a coroutine function unless an identical call is in progress
+
+        Only the calls on the same event loop are coalesced. If the caller
+        running the call is cancelled, the others waiting for it are not:
+        they call again, one of them running the call as a new caller.
+
+        Args:
+            key (Hashable): the identity of the call
+            fn (Callable[..., Awaitable]): the coroutine function
+
+        Raises:
+            Exception: the exception raised by the call
+
+        Returns:
+            the result of the call
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.__lock:
+                if (future := self.__futures.get(key)) is None:
+                    future = self.__futures[key] = loop.create_future()
+                    leader = True
+                elif future.get_loop() is loop:
+                    self.coalesced += 1
+                    leader = False
+                else:  # in progress on another loop
+                    future = None
+            if future is None:
+                return await fn(*args)
+            if leader:
+                break
+            # a cancelled waiter must not cancel the call it waits for
+            if (result := await asyncio.shield(future)) is not CANCELLED:
+                return result
+
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            future.set_result(CANCELLED)  # the key is removed before they call again
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved by the caller
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__futures[key]
+
+    def stats(self) -> dict[str, int]:
+        """get the counters
+
+        Returns:
+            dict[str, int]: in_flight (the calls in progress) and coalesced
+        """
+        with self.__lock:
+            return {
+                'in_flight': len(self.__flights) + len(self.__futures),
+                'coalesced': self.coalesced
+            }
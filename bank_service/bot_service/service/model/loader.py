@@ -1,36 +1,347 @@
 """load script to build a bot easily
+
+The definitions under DEFINITION_DIR are indexed when imported, reading
+only the file status and the title in the settings block. A bot model is
+parsed and built on first use, so the startup does not grow with the
+number of definitions. With a watcher (see watch), the changed
+definitions are rebuilt in the background and swapped in atomically,
+while the previous model keeps serving until then (or if the build fails).
+
+Typical usage:
+for schema, definition in loader.index.items():
+    print(schema, definition.title)
+
+bot = loader.get_bot(schema)
 """
+import concurrent.futures
+import hashlib
 import logging
 import os
+import threading
+import time
+import uuid
 
+from pathlib import Path
+from typing import Iterable
+
+import bot_service.service.model.artifact as artifact
 import bot_service.service.model.bot as bot_module
 
 from bot_service.service.model.parser import load_script
+from bot_service.service.util.crontab import Crontab
 
 
-bots: dict[str, bot_module.BotModel] = {}
+DEFINITION_DIR = str(Path(__file__).resolve().parent.parent.parent / 'definition')
 
-def __load_definition(path: str) -> None:
-    logger = logging.getLogger()
+
+class Definition:
+    """the index entry of a definition file
+    """
+    __slots__ = ('path', 'mtime', 'size', 'title', 'failed', 'lock')
+
+    def __init__(self, path: str) -> None:
+        """init
+
+        Args:
+            path (str): absolute path of the definition file
+
+        Raises:
+            OSError: fail to read the file
+        """
+        stat = os.stat(path)
+        self.path = path
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.title = read_title(path)
+        self.failed = False  # not to build again
+        self.lock = threading.Lock()  # building the model
+
+
+index: dict[str, Definition] = {}  # replaced (not modified) when files are added or removed
+bots: dict[str, bot_module.BotModel] = {}  # the models built
+version = 0  # increased when the index (a title, or a definition failing) is changed
+
+__crontab: Crontab | None = None
+
+
+def schema_id(path: str) -> str:
+    """get the schema id of a definition
+
+    The id is derived from the path relative to DEFINITION_DIR (not the
+    content), so it is the same on every machine, and kept when the
+    definition is edited. The symlinks are not resolved, so a definition
+    linked elsewhere (e.g. a mounted config map, relinked on updates)
+    keeps its id too.
+
+    Args:
+        path (str): path of the definition file
+
+    Returns:
+        str: the schema id
+    """
+    name = Path(os.path.relpath(os.path.abspath(path), DEFINITION_DIR)).as_posix()
+    return hashlib.blake2b(name.encode(), digest_size=8).hexdigest()
+
+
+def read_title(path: str) -> str:
+    """read the title in the settings block of a definition
+
+    Only the lines until the settings block are parsed.
+
+    Args:
+        path (str): path of the definition file
+
+    Returns:
+        str: the title, or the default title if not defined
+    """
     try:
         with open(path, 'r', encoding='utf8') as f:
-            script = load_script(f)
+            for command, sub_script in load_script(f, stream=True):
+                if command[0] != bot_module.CommandEnum.Setting:
+                    continue
+                for (_, k, v), _ in sub_script or ():
+                    if k == 'title':
+                        return v
+                break
+    except Exception:
+        pass  # reported when built
+    return bot_module.BotModel().get_settings()['title']
+
+
+def __load_definition(path: str) -> bot_module.BotModel | None:
+    logger = logging.getLogger()
+    try:
+        key = artifact.digest_file(path)
     except:
-        return
+        return None
 
-    if script is not None:
+    if (bot := artifact.load(path, key)) is None:
         bot = bot_module.BotModel()
-        success = bot.build_model(script)
-        if success:
-            bots[str(len(bots))] = bot
-        else:
+        try:
+            with open(path, 'r', encoding='utf8') as f:
+                success = bot.build_model(load_script(f, stream=True))
+        except Exception as e:
+            logger.warn("fail to load '%s': %s" % (path, e))
+            return None
+        if not success:
             logger.warn("fail to load '%s'." % path)
+            return None
+        artifact.dump(path, key, bot)
+
+    return bot
+
+
+def __build_definition(path: str) -> tuple[bot_module.BotModel | None, float]:
+    """load a definition, timing it (run in a worker process)
+    """
+    start = time.perf_counter()
+    bot = __load_definition(path)
+    return (bot, time.perf_counter() - start)
 
 
-__walk = os.walk('bot_service/definition')
+def build(schemas: Iterable[str], workers: int | None = None) -> dict[str, float]:
+    """build the models of some schemas in parallel
 
-for root, _, files in __walk:
-    for name in files:
-        if len(name) < 4 or name[-4:] != '.def':
+    The definitions are parsed and built across a process pool, then the
+    models are sent back pickled (see artifact.py). The models built
+    already are skipped.
+
+    Args:
+        schemas (Iterable[str]): the schema ids
+        workers (int | None, optional): number of processes, 1 to build in
+        this process. Defaults to None (the number of cpus).
+
+    Returns:
+        dict[str, float]: the seconds to build each schema
+    """
+    todo = [(schema, definition) for schema in schemas
+            if (definition := index.get(schema)) is not None
+            and schema not in bots and not definition.failed]
+    paths = [definition.path for _, definition in todo]
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        results = map(__build_definition, paths)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(workers)
+        results = pool.map(__build_definition, paths)  # in the order of paths
+
+    timings = {}
+    try:
+        for (schema, definition), (bot, seconds) in zip(todo, results):
+            with definition.lock:
+                if bot is None:
+                    __fail(definition)
+                elif schema not in bots:
+                    bots[schema] = bot
+            timings[schema] = seconds
+            logging.getLogger().info("built '%s' in %.3fs." % (definition.path, seconds))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return timings
+
+
+def __fail(definition: Definition) -> None:
+    """mark a definition failed to build (holding its lock)
+
+    It is left out of the options until changed, so the version is
+    increased as the index is changed.
+    """
+    global version
+    if not definition.failed:
+        definition.failed = True
+        version += 1
+
+
+def get_bot(schema: str) -> bot_module.BotModel | None:
+    """get the bot model of a schema, building it on first use
+
+    Args:
+        schema (str): the schema id
+
+    Returns:
+        BotModel: the bot model
+        None: unknown schema, or fail to build
+    """
+    if (bot := bots.get(schema)) is not None:
+        return bot
+    if (definition := index.get(schema)) is None or definition.failed:
+        return None
+    with definition.lock:  # the others wait for the model building
+        if (bot := bots.get(schema)) is None:
+            if (bot := __load_definition(definition.path)) is None:
+                __fail(definition)
+            else:
+                bots[schema] = bot
+    return bot
+
+
+def warm_up(names: Iterable[str], workers: int | None = None) -> None:
+    """build the models of some definitions in advance, in parallel
+
+    Args:
+        names (Iterable[str]): file names of the definitions, or '*' for
+        all the definitions
+        workers (int | None, optional): number of processes (see build).
+        Defaults to None (the number of cpus).
+    """
+    names = set(names)
+    build([schema for schema, definition in index.items()
+           if '*' in names or os.path.basename(definition.path) in names], workers)
+
+
+def reload(schema: str) -> bool:
+    """rebuild the model of a changed definition
+
+    The new model replaces the previous one only if built successfully,
+    and a model not built yet is built on its next use. The sessions keep
+    their stats by the stat keys (see BotModel.find_stat).
+
+    Args:
+        schema (str): the schema id
+
+    Returns:
+        bool: True if the new definition is applied
+    """
+    global version
+    definition = index[schema]
+    stat = os.stat(definition.path)
+    if schema not in bots:
+        with definition.lock:
+            definition.mtime, definition.size = stat.st_mtime_ns, stat.st_size
+            definition.title = read_title(definition.path)
+            definition.failed = False
+        version += 1
+        return True
+
+    bot = __load_definition(definition.path)  # the previous model is still serving
+    with definition.lock:
+        definition.mtime, definition.size = stat.st_mtime_ns, stat.st_size
+        if bot is None:
+            logging.getLogger().warn(
+                "keep the previous model of '%s'." % definition.path)
+            return False
+        definition.title = bot.get_settings()['title']
+        definition.failed = False
+        bots[schema] = bot
+    version += 1
+    logging.getLogger().info("reloaded '%s'." % definition.path)
+    return True
+
+
+def scan() -> None:
+    """check the definitions for the changes since indexed
+
+    Changed definitions are reloaded, new ones are indexed, and the
+    removed ones are dropped.
+    """
+    global index, version
+    schemas = {definition.path: schema for schema, definition in index.items()}
+    added = {}
+    for path in __walk():
+        if (schema := schemas.pop(path, None)) is None:
+            try:
+                added[schema_id(path)] = Definition(path)
+            except (OSError, ValueError) as e:
+                logging.getLogger().warn("fail to index '%s': %s" % (path, e))
+            continue
+        definition = index[schema]
+        try:
+            stat = os.stat(path)
+        except OSError:
             continue
-        __load_definition(f'{root}/{name}')
\ No newline at end of file
+        if (stat.st_mtime_ns, stat.st_size) != (definition.mtime, definition.size):
+            try:
+                reload(schema)
+            except Exception as e:
+                logging.getLogger().warn("fail to reload '%s': %s" % (path, e))
+
+    if added or schemas:
+        updated = index.copy()
+        updated.update(added)
+        for schema in schemas.values():  # removed
+            del updated[schema]
+            bots.pop(schema, None)
+        index = updated
+        version += 1
+
+
+def watch(interval: float) -> None:
+    """scan the definitions periodically in the background
+
+    Args:
+        interval (float): seconds between the scans
+    """
+    global __crontab
+
+    def poll() -> None:
+        try:
+            scan()
+        except Exception as e:
+            logging.getLogger().warn("fail to scan the definitions: %s" % e)
+        __crontab.add(str(uuid.uuid4()), interval, poll)
+
+    if __crontab is None:
+        __crontab = Crontab()
+        __crontab.add(str(uuid.uuid4()), interval, poll)
+
+
+def __walk() -> Iterable[str]:
+    for root, dirs, files in os.walk(DEFINITION_DIR):
+        dirs.sort()  # the same order on every machine
+        for name in sorted(files):
+            if len(name) < 4 or name[-4:] != '.def':
+                continue
+            yield os.path.join(root, name)
+
+
+def __index_definitions() -> None:
+    for path in __walk():
+        try:
+            index[schema_id(path)] = Definition(path)
+        except (OSError, ValueError) as e:
+            logging.getLogger().warn("fail to index '%s': %s" % (path, e))
+
+
+__index_definitions()
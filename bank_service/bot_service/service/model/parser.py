@@ -5,26 +5,44 @@ built based on recursive descend analysis.
 
 Typical usage:
 script = load_script(f)
+
+or, to parse a large definition with bounded memory:
+for command in load_script(f, stream=True):
+    ...
 """
 import logging
+import re
 
-from typing import IO
-
-from pyparsing import Suppress, Regex, Combine, Word, nums, ParserElement, ParseResults
-from pyparsing.exceptions import ParseException
+from typing import IO, Iterable, Iterator
 
 from bot_service.service.model.bot import CommandEnum
-
-
-__quote = Suppress('"')
-__content_quoted = __quote + Regex(r'[^"]*') + __quote
-__service = Suppress('service') + __content_quoted
-__text = Suppress('text') + __content_quoted + __content_quoted
-__script = Suppress('script') + __content_quoted + __content_quoted
-__script_wating = Suppress('script') + __content_quoted + __content_quoted + __content_quoted
-__faq = Suppress('faq') + __content_quoted
-__faq_item = __content_quoted + Suppress(':') + __content_quoted
-__setting = Suppress('settings')
+from bot_service.service.model.exception import AnalysisException
+
+
+# the lexical rules. a quoted content drops its leading blanks and keeps
+# everything else until the closing quote. the tabs of a command are
+# expanded first (as pyparsing did), so a tab in a content is spaces.
+__blank = r'[ \t\r\n]*'
+__content_quoted = __blank + r'"' + __blank + r'([^"]*)"'
+__end = __blank + r'\Z'
+# optional result caching of a script: cache <ttl seconds> [<max entries, not 0>]
+__cache = r'(?:[ \t\r\n]+cache[ \t\r\n]+(\d+(?:\.\d+)?)(?:[ \t\r\n]+([1-9]\d*))?)?'
+
+# a command is identified by its leading keyword (or a leading quote for
+# key-value items), then its fields are matched in a single pass.
+__keyword = re.compile(r'service|settings|script|text|faq|"')
+__grammar: dict[str, tuple[re.Pattern, CommandEnum | None]] = {
+    'service': (re.compile(__content_quoted + __end), CommandEnum.Service),
+    'text': (re.compile(__content_quoted * 2 + __end), CommandEnum.Text),
+    'script': (re.compile(
+        __content_quoted * 2 + '(?:' + __content_quoted + ')?' + __cache + __end),
+        None),
+    'faq': (re.compile(__content_quoted + __end), CommandEnum.FAQ),
+    '"': (re.compile(
+        __blank + r'([^"]*)"' + __blank + ':' + __content_quoted + __end),
+        CommandEnum.KVItem),
+    'settings': (re.compile(__end), CommandEnum.Setting)
+}
 
 __logger = logging.getLogger()
 
@@ -65,56 +83,49 @@ def identify_command(s: str) -> tuple | None:
         s (str): command string
     
     Returns:
-        tuple: (type, info ...)
+        tuple: (type, info ...). a script with the cache clause has two
+        more items, the ttl and the max entries (None if omitted)
         None: not indentified
     """
-    def safe_parse(pattern: ParserElement, s: str) -> ParseResults | None:
-        """parse a command string safely with no exception interruption
-
-        Returns:
-            ParseResult: the parse result
-            None: not matched
-        """
-        try:
-            result = pattern.parse_string(s, parse_all=True)
-        except ParseException:
-            return None
-        return result
-
-    if (r := safe_parse(__service, s)) is not None:
-        return (CommandEnum.Service, r[0])
-    elif (r := safe_parse(__text, s)) is not None:
-        return (CommandEnum.Text, r[0], r[1])
-    elif (r := safe_parse(__script_wating, s)) is not None:
-        return (CommandEnum.ScriptWaiting, r[0], r[1], r[2])
-    elif (r := safe_parse(__script, s)) is not None:
-        return (CommandEnum.Script, r[0], r[1])
-    elif (r := safe_parse(__faq, s)) is not None:
-        return (CommandEnum.FAQ, r[0])
-    elif (r := safe_parse(__faq_item, s)) is not None:
-        return (CommandEnum.KVItem, r[0], r[1])
-    elif (r := safe_parse(__setting, s)) is not None:
-        return (CommandEnum.Setting, )
-    else:
+    if '\t' in s:
+        s = s.expandtabs()
+    if (keyword := __keyword.match(s)) is None:
+        return None
+    pattern, cmd_type = __grammar[keyword.group()]
+    if (r := pattern.match(s, keyword.end())) is None:
         return None
 
+    if cmd_type is None:  # script, with or without the waiting tips
+        if r[3] is None:
+            command = (CommandEnum.Script, r[1], r[2])
+        else:
+            command = (CommandEnum.ScriptWaiting, r[1], r[2], r[3])
+        if r[4] is not None:  # (..., ttl, max entries) if cached
+            command += (r[4], r[5])
+        return command
+    return (cmd_type, ) + r.groups()
+
+
+def analyze_stream(lines: Iterable[str]) -> Iterator[tuple]:
+    """parsing the user defined script lazily, yielding top-level commands
+
+    It performs the same analysis as analyze, but consumes the lines one
+    by one. Each top-level command is analyzed and yielded together with
+    its sub-block as soon as the indentation of the block closes, so only
+    the largest block is kept in memory instead of the whole script.
+    Blocks with errors are not yielded, and when the lines run out, the
+    analysis fails if any error was found.
 
-def analyze(lines: list[str]) -> list:
-    """parsing the user defined script, returning well formatted script structure
-    
-    First, converting the indentation to code block with space lines
-    skipped. If there are some incorrect intendation, the analysis fails.
-    Second, synatic analysis will be performed, using the recursive 
-    descent analysis. It tries to identify all the lines to commands
-    defined in this module. If there are some lines cannot be identified
-    or appear at some incorrect code block, the analysis fails.
-    
     Args:
-        lines (list[str]): raw user script lines
-    
-    Returns:
-        list: formatted script object (list)
-    """    
+        lines (Iterable[str]): raw user script lines, e.g. a file object
+
+    Raises:
+        AnalysisException: the script has errors (after all the errors
+        are logged)
+
+    Yields:
+        tuple: formatted top-level command (command, sub_script)
+    """
     def recursive_analyze(head_type: CommandEnum, raw_struct: list[tuple[int, str] | list]) -> list[tuple] | None:
         """recursive descent analysis
 
@@ -170,10 +181,22 @@ def analyze(lines: list[str]) -> list:
             return None
         return script
         
+    def close_block() -> list[tuple]:
+        """analyze the pending top-level block then drop it
+        """
+        nonlocal fail_flag
+        script = recursive_analyze(CommandEnum.Root, root)
+        root.clear()
+        if script is None:
+            fail_flag = True
+            return []
+        return script
+
     fail_flag = False
-    
-    # step 1: convert indentation to structural script
+
+    # convert indentation to structural script, block by block
     stack = [(0, [])]
+    root: list = stack[0][1]
     line_cnt = 0
 
     for line in lines:
@@ -187,7 +210,11 @@ def analyze(lines: list[str]) -> list:
         top_level: int = stack_peek[0]
         top_script: list = stack_peek[1]
 
-        if level == top_level:  # same level
+        if level == 0:  # a top-level command closes the previous block
+            yield from close_block()
+            root.append((line_cnt, line.strip()))
+            del stack[1:]
+        elif level == top_level:  # same level
             top_script.append((line_cnt, line.strip()))
         elif level > top_level:  # sub code block
             sub_script = [(line_cnt, line.strip())]
@@ -209,35 +236,55 @@ def analyze(lines: list[str]) -> list:
                     continue
 
                 stack_peek[1].append((line_cnt, line.strip()))
-                stack = stack[:index + 1]  # apply changes
+                del stack[index + 1:]  # apply changes
                 break
 
-    # step 2: syntactic analysis
-    raw_struct = stack[0][1]
-    del stack
-    script = recursive_analyze(CommandEnum.Root, raw_struct)
-    
-    if fail_flag or script is None:
+    yield from close_block()
+
+    if fail_flag:
         __logger.warn("analysis failed.")
-        return None
+        raise AnalysisException("analysis failed.")
 
-    return script
+
+def analyze(lines: Iterable[str]) -> list:
+    """parsing the user defined script, returning well formatted script structure
+    
+    First, converting the indentation to code block with space lines
+    skipped. If there are some incorrect intendation, the analysis fails.
+    Second, synatic analysis will be performed, using the recursive 
+    descent analysis. It tries to identify all the lines to commands
+    defined in this module. If there are some lines cannot be identified
+    or appear at some incorrect code block, the analysis fails.
+    
+    Args:
+        lines (Iterable[str]): raw user script lines
+    
+    Returns:
+        list: formatted script object (list)
+        None: failed
+    """
+    try:
+        return list(analyze_stream(lines))
+    except AnalysisException:
+        return None
 
 
-def load_script(f: IO) -> list:
+def load_script(f: IO, stream: bool = False) -> list | Iterator[tuple]:
     """try to parse a file stream to a bot model builder readable script
 
     Args:
         f (IO): fp
+        stream (bool, optional): read the file lazily and return an
+        iterator of top-level commands (see analyze_stream). f must stay
+        open until the iterator is exhausted. Defaults to False.
 
     Returns:
         list: parsed script, accepting by bot model builder 
+        Iterator[tuple]: the top-level commands of parsed script, when
+        stream is set
+        None: failed
     """
-    lines = f.readlines()
-    script = analyze(lines)
-    
-    if script is None:
-        return None
-
-    return script
+    if stream:
+        return analyze_stream(f)
 
+    return analyze(f)
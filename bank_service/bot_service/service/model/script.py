@@ -0,0 +1,267 @@
+"""the module to reference the handlers of script modules
+
+A script command of the definition refers to a module under
+bot_service.service.model.module, whose `handle` function is
+called to generate the reply. The handle can be either a plain
+function or a coroutine function (async def), e.g. for the handlers
+calling backend services. The handler keeps the module name only
+when serialized, so a built bot model can be stored and loaded again.
+
+Typical usage:
+handler = ScriptHandler('evaluate')
+reply = handler()
+
+or, on an event loop:
+reply = await handler.call_async()
+
+The handlers run inline unless a pool is set to ScriptHandler.executor
+(see executor.py), which bounds the calls and their time. Identical
+calls in progress are coalesced into one (see flight.py), and a handler
+failing repeatedly is short-circuited for a while (see breaker.py). A handler
+created with a ttl (the cache clause of a script command) memoizes the
+replies by the arguments.
+"""
+import asyncio
+import importlib
+import inspect
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable
+
+from asgiref.sync import async_to_sync
+
+from bot_service.service.model.breaker import CircuitBreaker
+from bot_service.service.model.executor import ScriptExecutor
+from bot_service.service.model.flight import SingleFlight
+
+
+MODULE_PACKAGE = 'bot_service.service.model.module'
+CACHE_SIZE = 128  # the max entries of a cache if not specified
+
+
+def load_handle(module: str) -> Callable:
+    """import a script module and get its handle function
+
+    Args:
+        module (str): name of the module under MODULE_PACKAGE
+
+    Raises:
+        Exception: the handle of the module is not a function
+
+    Returns:
+        Callable: the handle function
+    """
+    m = importlib.import_module('.' + module, MODULE_PACKAGE)
+    if not inspect.isfunction(getattr(m, 'handle', None)):
+        raise Exception("%s.handle is not a function." % module)
+    return m.handle
+
+
+class ScriptCache:
+    """the lru cache of the replies of a handler, expiring after a ttl
+
+    Attributes:
+        hits (int): number of the replies found in the cache
+        misses (int): number of the replies not found (or expired)
+    """
+
+    def __init__(self, ttl: float, size: int = CACHE_SIZE) -> None:
+        """init
+
+        Args:
+            ttl (float): seconds to keep a reply
+            size (int, optional): the max entries. Defaults to CACHE_SIZE.
+        """
+        self.ttl = ttl
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__items: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: tuple) -> str | None:
+        """get a reply, refreshing its recency
+
+        Args:
+            key (tuple): the arguments of the call
+
+        Returns:
+            str: the reply
+            None: not cached or expired
+        """
+        with self.__lock:
+            item = self.__items.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self.__items[key]
+                self.misses += 1
+                return None
+            self.__items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: tuple, reply: str) -> None:
+        """cache a reply, evicting the least recently used one if full
+
+        Args:
+            key (tuple): the arguments of the call
+            reply (str): the reply
+        """
+        with self.__lock:
+            self.__items[key] = (time.monotonic() + self.ttl, reply)
+            self.__items.move_to_end(key)
+            if len(self.__items) > self.size:
+                self.__items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+
+class ScriptHandler:
+    """the callable reference to the handle of a script module
+
+    Attributes:
+        executor (ScriptExecutor | None): the pool shared by all the
+        handlers, None to call them inline
+        flights (SingleFlight): the calls in progress of all the handlers
+    """
+
+    executor: ScriptExecutor | None = None
+    flights = SingleFlight()
+
+    def __init__(self, module: str, ttl: float | None = None, size: int | None = None) -> None:
+        """init
+
+        Args:
+            module (str): name of the script module
+            ttl (float | None, optional): seconds to cache a reply. Defaults
+            to None (no cache).
+            size (int | None, optional): the max entries of the cache.
+            Defaults to None (CACHE_SIZE).
+        """
+        self.module = module
+        self.__handle = load_handle(module)
+        self.is_async = inspect.iscoroutinefunction(self.__handle)
+        self.cache = None
+        if ttl is not None:
+            self.cache = ScriptCache(ttl, CACHE_SIZE if size is None else size)
+        self.breaker = CircuitBreaker(module)
+
+    def __call__(self, *args) -> str:
+        """call the handle, blocking until the reply is generated
+
+        The call is run on the executor if there is one. The identical
+        calls in progress (of the same module and arguments) are run once.
+        While the circuit is open, the last good reply is returned.
+
+        Raises:
+            RejectedException: the queue of the executor is full
+            TimeoutError: the handle did not return in time
+            CircuitOpenException: the circuit is open, and no good reply
+
+        Returns:
+            str: the reply
+        """
+        if self.cache is not None and (reply := self.cache.get(args)) is not None:
+            return reply
+        if not self.breaker.allow():
+            return self.breaker.fallback(args)
+        return ScriptHandler.flights.do((self.module, ) + args, self.__run, *args)
+
+    def __run(self, *args) -> str:
+        try:
+            if (executor := ScriptHandler.executor) is not None:
+                reply = executor.run(self.invoke, *args)
+            else:
+                reply = self.invoke(*args)
+        except:
+            self.breaker.fail()
+            raise
+        self.breaker.succeed(args, reply)
+        if self.cache is not None:
+            self.cache.put(args, reply)
+        return reply
+
+    def invoke(self, *args) -> str:
+        """call the handle in this thread
+
+        An async handle is run to completion by async_to_sync, so it must
+        not be called from the thread running an event loop (use
+        call_async there).
+
+        Returns:
+            str: the reply
+        """
+        if self.is_async:
+            return async_to_sync(self.__handle)(*args)
+        return self.__handle(*args)
+
+    async def call_async(self, *args) -> str:
+        """call the handle without blocking the event loop
+
+        An async handle is awaited directly (within the timeout of the
+        executor if there is one), while a sync one is offloaded to the
+        executor, or a worker thread without it. The identical calls in
+        progress on the event loop are run once. While the circuit is open,
+        the last good reply is returned.
+
+        Raises:
+            RejectedException: the queue of the executor is full
+            TimeoutError: the handle did not return in time
+            CircuitOpenException: the circuit is open, and no good reply
+
+        Returns:
+            str: the reply
+        """
+        if self.cache is not None and (reply := self.cache.get(args)) is not None:
+            return reply
+        if not self.breaker.allow():
+            return self.breaker.fallback(args)
+        return await ScriptHandler.flights.do_async(
+            (self.module, ) + args, self.__run_async, *args)
+
+    async def __run_async(self, *args) -> str:
+        executor = ScriptHandler.executor
+        try:
+            if self.is_async:
+                if executor is None:
+                    reply = await self.__handle(*args)
+                else:
+                    reply = await executor.wait(self.__handle(*args))
+            elif executor is None:
+                reply = await asyncio.to_thread(self.__handle, *args)
+            else:
+                reply = await executor.run_async(self.invoke, *args)
+        except:
+            self.breaker.fail()
+            raise
+        self.breaker.succeed(args, reply)
+        if self.cache is not None:
+            self.cache.put(args, reply)
+        return reply
+
+    def stats(self) -> dict[str, int | str]:
+        """get the counters of the handler
+
+        Returns:
+            dict[str, int | str]: module, circuit (the state of the circuit
+            breaker), and hits, misses and entries of the cache if cached
+        """
+        stats = {'module': self.module, 'circuit': self.breaker.state}
+        if self.cache is not None:
+            stats['hits'] = self.cache.hits
+            stats['misses'] = self.cache.misses
+            stats['entries'] = len(self.cache)
+        return stats
+
+    def __getstate__(self) -> dict:
+        state = {'module': self.module}
+        if self.cache is not None:  # the cached replies are dropped
+            state['ttl'] = self.cache.ttl
+            state['size'] = self.cache.size
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['module'], state.get('ttl'), state.get('size'))
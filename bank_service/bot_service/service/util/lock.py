@@ -0,0 +1,126 @@
+"""the module to lock by key with a fixed pool of locks
+
+A lock per key (e.g. per session) has to be created, found and dropped
+when the key expires, and the table grows with the keys. A striped lock
+keeps a fixed number of locks instead, and a key is hashed to one of
+them, so the memory is bounded whatever the number of keys. Two keys may
+share a stripe, which only makes them wait for each other now and then.
+
+Typical usage:
+locks = StripedLock(1024)
+with locks.hold(key):
+    ...
+
+or, on an event loop:
+async with locks.hold_async(key):
+    ...
+"""
+import asyncio
+import threading
+import weakref
+
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Hashable, Iterator
+
+
+class StripedLock:
+    """a fixed pool of locks, hashed by key
+
+    Attributes:
+        acquired (int): number of the acquisitions
+        contended (int): number of the acquisitions waiting for another
+        holder (counted without a lock, so approximate)
+    """
+
+    POLL_MIN = 0.0005  # seconds
+    POLL_MAX = 0.01
+
+    def __init__(self, stripes: int = 1024) -> None:
+        """init
+
+        Args:
+            stripes (int, optional): number of locks. Defaults to 1024.
+        """
+        self.stripes = stripes
+        self.acquired = 0
+        self.contended = 0
+        self.__locks = [threading.Lock() for _ in range(stripes)]
+        # loop -> {stripe: the queue of the tasks of the loop waiting for it}
+        self.__queues: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[int, asyncio.Lock]] = \
+            weakref.WeakKeyDictionary()
+
+    def get(self, key: Hashable) -> threading.Lock:
+        """get the lock of a key
+
+        Args:
+            key (Hashable): the key
+
+        Returns:
+            threading.Lock: the lock
+        """
+        return self.__locks[hash(key) % self.stripes]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        """hold the lock of a key in a with block
+
+        Args:
+            key (Hashable): the key
+        """
+        lock = self.get(key)
+        if not lock.acquire(blocking=False):
+            self.contended += 1
+            lock.acquire()
+        self.acquired += 1
+        try:
+            yield
+        finally:
+            lock.release()
+
+    @asynccontextmanager
+    async def hold_async(self, key: Hashable) -> AsyncIterator[None]:
+        """hold the lock of a key in an async with block
+
+        The lock is waited on the event loop, not in a thread: the tasks of
+        the loop waiting for the stripe queue on an asyncio lock, and the
+        first one polls the thread lock (held by a thread or another task)
+        with a growing delay up to POLL_MAX seconds. A cancelled waiter
+        holds nothing.
+
+        Args:
+            key (Hashable): the key
+        """
+        stripe = hash(key) % self.stripes
+        lock = self.__locks[stripe]
+        if not lock.acquire(blocking=False):
+            self.contended += 1
+            async with self.__queue(stripe):
+                delay = StripedLock.POLL_MIN
+                while not lock.acquire(blocking=False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, StripedLock.POLL_MAX)
+        self.acquired += 1
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def __queue(self, stripe: int) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if (queues := self.__queues.get(loop)) is None:
+            queues = self.__queues[loop] = {}
+        if (queue := queues.get(stripe)) is None:
+            queue = queues[stripe] = asyncio.Lock()
+        return queue
+
+    def stats(self) -> dict[str, int]:
+        """get the counters
+
+        Returns:
+            dict[str, int]: stripes, acquired and contended
+        """
+        return {
+            'stripes': self.stripes,
+            'acquired': self.acquired,
+            'contended': self.contended
+        }
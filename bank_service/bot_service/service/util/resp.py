@@ -1,5 +1,13 @@
 """a simple module to generate specified response
 """
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse, HttpResponseNotModified
+
+
 def fail(msg: str) -> dict:
     """when a request's response fails to make, use this
 
@@ -49,4 +57,40 @@ def success(resp_body: dict | list=None) -> dict:
         'msg': "success",
         'data': resp_body
     }
-    return resp
\ No newline at end of file
+    return resp
+
+
+def serialize(resp: dict) -> tuple[bytes, str]:
+    """serialize a response once, to send it many times
+
+    Args:
+        resp (dict): the response
+
+    Returns:
+        tuple[bytes, str]: (the body same as JsonResponse, its strong etag)
+    """
+    body = json.dumps(resp, cls=DjangoJSONEncoder).encode()
+    return body, '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def conditional(request: HttpRequest, body: bytes, etag: str) -> HttpResponse:
+    """send a serialized response, or 304 if the client has it already
+
+    Args:
+        request (HttpRequest): user request
+        body (bytes): the serialized response
+        etag (str): the etag of the body
+
+    Returns:
+        HttpResponse: response
+    """
+    if request.method in ('GET', 'HEAD'):
+        tags = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if tags.strip() == '*' or etag in (
+                tag.strip().removeprefix('W/') for tag in tags.split(',')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
\ No newline at end of file
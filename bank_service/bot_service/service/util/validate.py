@@ -51,11 +51,24 @@ def validate(http_req: HttpRequest, schema: object) -> Tuple[bool, dict]:
         http_req (HttpRequest): an user http request
         schema (object): a json schema matches the wanted request
 
+    Returns:
+        Tuple[bool, dict]: (status, a verified request dict or failing response)
+    """
+    return validate_json(http_req.body, schema)
+
+
+def validate_json(body: str | bytes, schema: object) -> Tuple[bool, dict]:
+    """validate a json document (e.g. a websocket frame) with a schema
+
+    Args:
+        body (str | bytes): the json document
+        schema (object): a json schema matches the wanted request
+
     Returns:
         Tuple[bool, dict]: (status, a verified request dict or failing response)
     """
     try:
-        req = json.loads(http_req.body)
+        req = json.loads(body)
         jsonschema.validate(req, schema=schema)
     except JSONDecodeError:
         return FAIL, resp.fail("bad json format")
@@ -22,6 +22,7 @@ import bot_service.controller.portal as portal
 urlpatterns = [
     path('chat/init', session.init),
     path('chat/message', session.message),
+    path('chat/messages', session.messages),
     path('portal/option', portal.option),
     path('portal/detail', portal.detail)
 ]
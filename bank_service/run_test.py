@@ -7,6 +7,12 @@ from django.core.management import execute_from_command_line
 execute_from_command_line([sys.path[0], 'check'])
 
 
+import tests.test_artifact as test_artifact
+import tests.test_executor as test_executor
+import tests.test_loader as test_loader
+import tests.test_portal as test_portal
+import tests.test_session as test_session
+import tests.test_websocket as test_websocket
 import tests.test_auth as test_auth
 import tests.test_bot as test_bot
 import tests.test_parser as test_parser
@@ -17,6 +23,12 @@ from typing import Callable
 parser_tester = test_parser.TestParser()
 bot_tester = test_bot.TestBot()
 auth_tester = test_auth.TestAuth()
+artifact_tester = test_artifact.TestArtifact()
+executor_tester = test_executor.TestExecutor()
+loader_tester = test_loader.TestLoader()
+portal_tester = test_portal.TestPortal()
+session_tester = test_session.TestSession()
+websocket_tester = test_websocket.TestWebsocket()
 
 tot_cnt = 0
 fail_cnt = 0
@@ -40,13 +52,43 @@ if __name__ == '__main__':
     safe_test(parser_tester.test_incorrect)
     safe_test(parser_tester.test_naughty_indent)
     safe_test(parser_tester.test_recursive)
+    safe_test(parser_tester.test_identify)
+    safe_test(parser_tester.test_stream)
 
     safe_test(bot_tester.test_complicated)
+    safe_test(bot_tester.test_faq_index)
+    safe_test(bot_tester.test_faq_ranking)
+    safe_test(bot_tester.test_navigation)
+    safe_test(bot_tester.test_dispatch)
+    safe_test(bot_tester.test_batch)
+    safe_test(bot_tester.test_async)
+    safe_test(bot_tester.test_cache)
+    safe_test(bot_tester.test_stable_stats)
 
     safe_test(auth_tester.test_expire)
     safe_test(auth_tester.test_generate)
     safe_test(auth_tester.test_preprocess)
 
+    safe_test(artifact_tester.test_roundtrip)
+    safe_test(executor_tester.test_bounded)
+    safe_test(executor_tester.test_single_flight)
+    safe_test(executor_tester.test_circuit_breaker)
+    safe_test(loader_tester.test_lazy)
+    safe_test(loader_tester.test_reload)
+    safe_test(loader_tester.test_failed)
+    safe_test(loader_tester.test_symlink)
+    safe_test(loader_tester.test_parallel)
+    safe_test(portal_tester.test_etag)
+    safe_test(session_tester.test_memory)
+    safe_test(session_tester.test_shm)
+    safe_test(session_tester.test_lock)
+    safe_test(session_tester.test_lock_async)
+    safe_test(session_tester.test_cookie)
+    safe_test(session_tester.test_restore)
+    safe_test(session_tester.test_messages)
+    safe_test(session_tester.test_async)
+    safe_test(websocket_tester.test_chat)
+
     print(f"test completed. ({tot_cnt - fail_cnt}/{tot_cnt} succeed)")
     
     exit(0)
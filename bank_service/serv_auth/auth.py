@@ -2,6 +2,7 @@
 """
 from jwt import encode as encodeJWT, decode as decodeJWT
 
+import asyncio
 import functools
 import io
 import time
@@ -28,15 +29,30 @@ with io.open(JWT_PUBLIC_PATH, 'rb') as pub:
 
 class ExposeAuthorizationMiddleware:
     """middleware to allow authorization read by frontend
+
+    It works both in a sync and an async chain, so an async view is not
+    adapted to a thread for it.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine  # seen as async by django
 
     def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall(request)
         response = self.get_response(request)
         response['Access-Control-Expose-Headers'] = "Authorization"
         return response
 
+    async def __acall(self, request):
+        response = await self.get_response(request)
+        response['Access-Control-Expose-Headers'] = "Authorization"
+        return response
+
 
 # 生成token
 def generateToken(
@@ -72,46 +88,91 @@ def generateToken(
     return token
 
 
+def verifyToken(token: str) -> dict:
+    """verify a jwt
+
+    Args:
+        token (str): the token
+
+    Raises:
+        jwt.ExpiredSignatureError: the token expired
+        jwt.DecodeError: the token is broken
+
+    Returns:
+        dict: the payload
+    """
+    return decodeJWT(token, JWT_PUBLIC, algorithms=['RS256'])
+
+
+def __refreshToken(token: str | None) -> tuple[str | None, dict | None]:
+    """verify a jwt and sign it again with a new expiry
+
+    Args:
+        token (str | None): the token in the request
+
+    Returns:
+        tuple[str | None, dict | None]: (the new token, None), or (None,
+        the failing response)
+    """
+    if token is None:
+        return None, {
+            'code': 50008,
+            'msg': 'need login'
+        }
+    try:
+        try:
+            payload = verifyToken(token)
+            payload['exp'] = int(time.time()) + JWT_EXPIRE_IN
+            return generateToken(payload=payload), None
+        except jwt.ExpiredSignatureError:
+            return None, {
+                'code': 50014,
+                'msg': 'token expired'
+            }
+        except jwt.DecodeError:
+            return None, {
+                'code': 50008,
+                'msg': 'token broken'
+            }
+    except Exception as e:
+        print(e)
+        return None, {
+            'code': 0,
+            'message': 'error occured while handling token'
+        }
+
+
 # 装饰器 更新token 检测过期并重定向
 def preprocessToken(requestHandler: Callable) -> Callable:
     """decorator. check token before access api
 
+    An async api method gets an async wrapper, which verifies and signs
+    the token (rsa, heavy for the event loop) in a thread.
+
     Args:
         requestHandler (Callable): the api method
 
     Returns:
         Callable: warpped api method
     """
+    if asyncio.iscoroutinefunction(requestHandler):
+        @functools.wraps(requestHandler)
+        async def async_wrapper(request: HttpRequest):
+            token, error = await asyncio.to_thread(
+                __refreshToken, request.META.get('HTTP_AUTHORIZATION'))
+            if error is not None:
+                return JsonResponse(error)
+            response: JsonResponse = await requestHandler(request)
+            response['Authorization'] = token
+            return response
+        return async_wrapper
+
     @functools.wraps(requestHandler)
     def wrapper(request: HttpRequest):
         # update token here
-        token = request.META.get('HTTP_AUTHORIZATION')
-        if token is None:
-            return JsonResponse({
-                'code': 50008,
-                'msg': 'need login'
-            })
-        try:
-            try:
-                payload = decodeJWT(token, JWT_PUBLIC, algorithms=['RS256'])
-                payload['exp'] = int(time.time()) + JWT_EXPIRE_IN
-                token = generateToken(payload=payload)
-            except jwt.ExpiredSignatureError:
-                return JsonResponse({
-                    'code': 50014,
-                    'msg': 'token expired'
-                })
-            except jwt.DecodeError:
-                return JsonResponse({
-                    'code': 50008,
-                    'msg': 'token broken'
-                })
-        except Exception as e:
-            print(e)
-            return JsonResponse({
-                'code': 0,
-                'message': 'error occured while handling token'
-            })
+        token, error = __refreshToken(request.META.get('HTTP_AUTHORIZATION'))
+        if error is not None:
+            return JsonResponse(error)
         response: JsonResponse = requestHandler(request)
         response['Authorization'] = token
         return response
@@ -0,0 +1,39 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import bot_service.service.model.artifact as artifact
+
+from bot_service.service.model.bot import BotModel
+from bot_service.service.model.parser import load_script
+
+
+class TestArtifact(unittest.TestCase):
+
+    def test_roundtrip(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'script.def')
+            shutil.copy('bot_service/definition/script.def', path)
+            with open(path, 'rb') as f:
+                key = artifact.digest(f.read())
+
+            assert artifact.load(path, key) is None
+
+            with open(path, 'r', encoding='utf8') as f:
+                script = load_script(f)
+            bot = BotModel()
+            assert bot.build_model(script)
+            assert artifact.dump(path, key, bot)
+
+            loaded = artifact.load(path, key)
+            assert loaded is not None
+            assert loaded.get_settings() == bot.get_settings()
+            for stat, msg in [(0, None), (0, '理财'), (1, '理财产品推荐评估'),
+                              (0, '基础金融业务'), (2, '附近网点查询')]:
+                assert loaded.handle_message(stat, msg) == bot.handle_message(stat, msg)
+
+            assert artifact.load(path, artifact.digest(b'changed')) is None
@@ -1,9 +1,16 @@
+import asyncio
 import logging
+import math
+import sys
+import time
+import types
 import unittest
 
 import bot_service.service.model.parser as parser
 
-from bot_service.service.model.bot import BotModel, CommandEnum
+from bot_service.service.model.bot import BotModel, BotNode, CommandEnum
+from bot_service.service.model.faq import FaqIndex
+from bot_service.service.model.script import CACHE_SIZE, MODULE_PACKAGE, ScriptHandler
 
 
 class TestBot(unittest.TestCase):
@@ -90,3 +97,340 @@ class TestBot(unittest.TestCase):
         stat, msg = bot.handle_message(stat, "text test5")
         assert len(msg) == 1
         assert msg[0] == 'test5'
+
+    def test_faq_index(self) -> None:
+        items = [
+            ('我适合什么样的理财产品？', '选择理财产品需要根据自己对风险的承受能力'),
+            ('七日年化利率与年利率有什么区别？', '七日年化利率是通过过去七日的收益情况估计的年利率'),
+            ('如何使用定期投资功能？', '前往首页'),
+            ('faq test1', 'answer1'),
+            ('faq test10', 'answer10'),
+            ('faq test1', 'answer1 replaced')
+        ]
+        node = BotNode()
+        faq = {}
+        for q, a in items:
+            node.set_faq(q, a)
+            faq[q] = a
+
+        def search(q: str) -> str | None:  # the linear scan of faq
+            result = ""
+            cnt = 0
+            for k, v in faq.items():
+                cnt += 1
+                if q not in k:
+                    continue
+                if cnt > 1:
+                    result += '\n'
+                result += f"{cnt}. {k}\n{v}"
+            return result if len(result.strip()) > 0 else None
+
+        for q in ['', '理', '理财', '利率', '年利率有', '？', 'faq test1', 'test10',
+                  '1', 'faq test2', '不存在', '如何使用定期投资功能？吗']:
+            assert node.search_faq(q) == search(q)
+        assert node.get_all_faq() == search('')
+
+    def test_faq_ranking(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+
+        questions = [
+            '我适合什么样的理财产品？',
+            '七日年化利率与年利率有什么区别？',
+            '如何使用定期投资功能？',
+            '如何开通手机银行？',
+            '信用卡丢了怎么办？'
+        ]
+        script = [
+            ((CommandEnum.Setting,), [
+                ((CommandEnum.KVItem, 'faq_mode', 'rank'), None),
+                ((CommandEnum.KVItem, 'faq_top_k', '2'), None),
+                ((CommandEnum.KVItem, 'faq_threshold', '0.25'), None)
+            ]),
+            ((CommandEnum.Service, 'service1'), [
+                ((CommandEnum.FAQ, 'faq1'), [
+                    ((CommandEnum.KVItem, q, f'answer{i + 1}'), None)
+                    for i, q in enumerate(questions)
+                ])
+            ])
+        ]
+        bot = BotModel()
+        assert bot.build_model(script)
+
+        stat, _ = bot.handle_message(0, 'service1')
+        _, msg = bot.handle_message(stat, '怎么开通手机银行')
+        assert msg == ['4. 如何开通手机银行？\nanswer4']
+        _, msg = bot.handle_message(stat, '年利率')
+        assert msg == ['2. 七日年化利率与年利率有什么区别？\nanswer2']
+        _, msg = bot.handle_message(stat, 'hello')
+        assert msg == [bot.get_settings()['unknown']]
+
+        node = BotNode()
+        for i, q in enumerate(questions):
+            node.set_faq(q, f'answer{i + 1}')
+        node.enable_faq_ranking(5, 0.0)
+
+        def cosine(q: str, stop: float = math.inf) -> list[int]:  # the dense TF-IDF similarity
+            docs = [FaqIndex.features(k) for k in questions]
+            idf = {}
+            for doc in docs:
+                for f in doc:
+                    idf[f] = idf.get(f, 0) + 1
+            idf = {f: math.log((len(docs) + 1) / (df + 1)) + 1 for f, df in idf.items() if df <= stop}
+            docs = [doc & idf.keys() for doc in docs]
+            query = {f for f in FaqIndex.features(q) if f in idf}
+            scores = []
+            for i, doc in enumerate(docs):
+                dot = sum([idf[f] ** 2 for f in doc & query])
+                if dot > 0:
+                    norm = math.sqrt(sum([idf[f] ** 2 for f in doc]) * sum([idf[f] ** 2 for f in query]))
+                    scores.append((-dot / norm, i))
+            return [i for _, i in sorted(scores)]
+
+        def check(node: BotNode, stop: float = math.inf) -> None:
+            for q in ['理财产品', '利率', '如何使用', '信用卡', '？', '如何', 'hello']:
+                reply = node.search_faq(q)
+                expected = cosine(q, stop)[:5]  # top-k
+                if len(expected) == 0:
+                    assert reply is None
+                else:
+                    assert reply == '\n'.join([
+                        f"{i + 1}. {questions[i]}\nanswer{i + 1}" for i in expected])
+
+        check(node)
+
+        questions.append('如何挂失信用卡？')  # weighted again by the next search
+        node.set_faq(questions[-1], 'answer6')
+        check(node)
+
+        saved = FaqIndex.STOP_RATIO, FaqIndex.STOP_MIN
+        FaqIndex.STOP_RATIO, FaqIndex.STOP_MIN = 0.3, 1  # '？', '如何' in most questions
+        try:
+            node = BotNode()
+            for i, q in enumerate(questions):
+                node.set_faq(q, f'answer{i + 1}')
+            node.enable_faq_ranking(5, 0.0)
+            check(node, 0.3 * len(questions))
+            assert node.search_faq('？') is None
+        finally:
+            FaqIndex.STOP_RATIO, FaqIndex.STOP_MIN = saved
+
+    def test_navigation(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+
+        script = [
+            ((CommandEnum.Service, 'A'), [
+                ((CommandEnum.Service, 'A1'), [
+                    ((CommandEnum.Text, 'text a1', 'a1'), None)
+                ])
+            ]),
+            ((CommandEnum.Service, 'B'), [
+                ((CommandEnum.Service, 'B1'), None),
+                ((CommandEnum.ScriptWaiting, 'check', 'tips', 'check'), None),
+                ((CommandEnum.Script, 'evaluate', 'evaluate'), None)
+            ])
+        ]
+        bot = BotModel()
+        assert bot.build_model(script)
+        settings = bot.get_settings()
+
+        _, (root, ) = bot.handle_message(0, None)
+        stat, (menu_b, ) = bot.handle_message(0, 'B')
+        stat_b = stat
+
+        # return from the second service goes back to the root
+        stat, msg = bot.handle_message(stat, settings['back'])
+        assert stat == 0
+        assert msg == [settings['back_success'], root[:-len(settings['back_info']) - 1]]
+
+        # waiting after a sub-service waits for the right script
+        stat, msg = bot.handle_message(stat_b, 'check')
+        assert msg == ['tips\n', settings['cancel_info']]
+        stat, msg = bot.handle_message(stat, 'phone')
+        assert stat == stat_b
+        assert msg == ['http://s.manmanbuy.com/Default.aspx?key=phone']
+
+        stat, msg = bot.handle_message(stat_b, 'B1')
+        stat, msg = bot.handle_message(stat, settings['back'])
+        assert stat == stat_b
+        assert msg == [settings['back_success'], menu_b]
+
+    def test_dispatch(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = False
+
+        script = [
+            ((CommandEnum.Service, 'A'), [
+                ((CommandEnum.Text, 'B', 'text B'), None),
+                ((CommandEnum.Text, 'faq', 'text faq'), None),
+                ((CommandEnum.ScriptWaiting, 'branch', 'tips', 'querybranch'), None),
+                ((CommandEnum.FAQ, 'faq'), [
+                    ((CommandEnum.KVItem, 'question', 'answer'), None)
+                ]),
+                ((CommandEnum.Service, 'B'), None)
+            ])
+        ]
+        bot = BotModel()
+        with self.assertLogs(logger, logging.WARNING) as logs:
+            assert bot.build_model(script)
+        logger.disabled = True
+        assert any(["faq 'faq' in service 'A' is shadowed by option." in s for s in logs.output])
+        assert any(["option 'B' in service 'A' is shadowed by sub-service." in s for s in logs.output])
+        settings = bot.get_settings()
+
+        stat, _ = bot.handle_message(0, 'A')
+        _, msg = bot.handle_message(stat, 'faq')
+        assert msg == ['text faq']
+        next_stat, msg = bot.handle_message(stat, 'B')
+        assert next_stat != stat
+        assert msg[0].startswith(settings['welcome'])
+
+        # querybranch.handle takes no argument, waiting for it fails
+        wait, _ = bot.handle_message(stat, 'branch')
+        next_stat, msg = bot.handle_message(wait, 'somewhere')
+        assert next_stat == stat
+        assert msg == [settings['error']]
+        next_stat, msg = bot.handle_message(wait, settings['cancel'])
+        assert next_stat == stat
+        assert msg == [settings['cancel_success']]
+
+    def test_batch(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        with open('bot_service/definition/script.def', 'r', encoding='utf8') as f:
+            script = parser.load_script(f)
+        bot = BotModel()
+        assert bot.build_model(script)
+
+        msgs = [None, '理财', '产品介绍', '理财产品推荐评估', '常见问题', '利率',
+                '返回', '基础金融业务', '附近网点查询', '西城', '附近网点查询',
+                '取消', '返回', '不存在']
+        expected = []
+        stat = 0
+        for msg in msgs:
+            stat, replies = bot.handle_message(stat, msg)
+            expected.append((stat, replies))
+
+        assert bot.handle_conversation(msgs) == expected
+        pairs = [(0, None)] + [(expected[i][0], msg) for i, msg in enumerate(msgs[1:])]
+        assert bot.handle_messages(pairs) == expected
+        assert bot.handle_messages(reversed(pairs)) == expected[::-1]
+
+    def test_async(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        bots = []
+        for path in ['bot_service/definition/script.def', 'bot_service/definition/script3.def']:
+            with open(path, 'r', encoding='utf8') as f:
+                script = parser.load_script(f)
+            bot = BotModel()
+            assert bot.build_model(script)
+            bots.append(bot)
+
+        async def converse(bot: BotModel, msgs: list[str | None]) -> list:
+            results = []
+            stat = 0
+            for msg in msgs:
+                stat, replies = await bot.handle_message_async(stat, msg)
+                results.append((stat, replies))
+            return results
+
+        # an async handler, defined here (the shipped handlers are sync)
+        module = types.ModuleType(MODULE_PACKAGE + '.test_async_check')
+
+        async def handle(msg: str) -> str:
+            await asyncio.sleep(0)
+            return 'async %s' % msg
+
+        module.handle = handle
+        sys.modules[module.__name__] = module
+        try:
+            bot = BotModel()
+            assert bot.build_model(parser.analyze([
+                'service "a"',
+                '    script "check" "tips" "test_async_check"'
+            ]))
+            bots.append(bot)
+
+            conversations = [  # sync (evaluate, querybranch, check) and async handlers
+                (bots[0], [None, '理财', '理财产品推荐评估', '返回', '基础金融业务',
+                           '附近网点查询', '西城', '不存在']),
+                (bots[1], [None, '商品业务', '查价格', '手机', '查价格', '取消', '常见问题']),
+                (bots[2], [None, 'a', 'check', 'x', 'check', 'y'])
+            ]
+            for bot, msgs in conversations:
+                expected = bot.handle_conversation(msgs)
+                assert asyncio.run(converse(bot, msgs)) == expected
+        finally:
+            del sys.modules[module.__name__]
+        assert expected[3][1] == ['async x'] and expected[5][1] == ['async y']
+
+    def test_cache(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        script = parser.analyze([
+            'service "a"',
+            '    script "evaluate" "evaluate" cache 60',
+            '    script "check" "tips" "check" cache 0.05 1',
+            '    script "branch" "querybranch"'
+        ])
+        bot = BotModel()
+        assert bot.build_model(script)
+
+        for _ in range(3):
+            assert bot.handle_message(1, 'evaluate') == (1, ['你适合稳健型的理财产品。'])
+        for msg in ['x', 'x', 'y', 'x']:  # only one entry is kept
+            assert bot.handle_message(2, msg) == (1, ['http://s.manmanbuy.com/Default.aspx?key=%s' % msg])
+        stats = {s['option']: s for s in bot.get_script_stats()}
+        assert stats['evaluate'] == {'option': 'evaluate', 'module': 'evaluate', 'circuit': 'closed',
+                                     'hits': 2, 'misses': 1, 'entries': 1}
+        assert (stats['check']['hits'], stats['check']['misses']) == (1, 3)
+        assert 'hits' not in stats['branch']
+
+        time.sleep(0.05)
+        bot.handle_message(2, 'x')  # expired
+        assert bot.get_script_stats()[1]['misses'] == 4
+
+        assert parser.analyze(['service "a"', '    script "check" "check" cache 60 0']) is None
+        handler = ScriptHandler('check', 60.0, 0)  # not by the grammar, but kept as given
+        assert handler.cache.size == 0 and ScriptHandler('check', 60.0).cache.size == CACHE_SIZE
+        handler('x')
+        assert len(handler.cache) == 0
+
+    def test_stable_stats(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+
+        def build(lines: list[str]) -> BotModel:
+            bot = BotModel()
+            assert bot.build_model(parser.analyze(lines))
+            return bot
+
+        v1 = build(['service "a"',
+                    '    script "wait" "tips" "check"',
+                    'service "b"',
+                    '    service "c"'])
+        v2 = build(['service "new"',
+                    'service "a"',
+                    '    text "text" "text"',
+                    '    script "wait" "tips" "check"',
+                    'service "b"',
+                    '    service "c"'])
+        v3 = build(['service "b"',
+                    '    service "c"'])
+        assert v1.get_revision() == build(['service "a"', '    script "wait" "tips" "check"',
+                                           'service "b"', '    service "c"']).get_revision()
+        assert len({v1.get_revision(), v2.get_revision(), v3.get_revision()}) == 3
+
+        # 0: root, 1: a, 2: wait, 3: b, 4: c
+        wait = v1.handle_message(1, 'wait')[0]
+        c = v1.handle_message(v1.handle_message(0, 'b')[0], 'c')[0]
+        assert v2.find_stat(v1.get_stat_key(wait)) == v2.handle_message(2, 'wait')[0]
+        assert v2.find_stat(v1.get_stat_key(c)) == v2.handle_message(
+            v2.handle_message(0, 'b')[0], 'c')[0]
+        assert v2.find_stat('unknown') is None
+
+        # v1 -> v3 without v2, e.g. another process
+        assert v3.find_stat(v1.get_stat_key(c)) == 2
+        assert v3.find_stat(v1.get_stat_key(wait)) is None  # removed
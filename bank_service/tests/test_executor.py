@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import threading
+import time
+import unittest
+
+from bot_service.service.model.bot import BotModel
+from bot_service.service.model.breaker import CircuitBreaker
+from bot_service.service.model.exception import CircuitOpenException, RejectedException
+from bot_service.service.model.executor import ScriptExecutor
+from bot_service.service.model.flight import SingleFlight
+from bot_service.service.model.parser import load_script
+from bot_service.service.model.script import ScriptHandler
+
+
+class TestExecutor(unittest.TestCase):
+
+    def test_bounded(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        executor = ScriptExecutor('thread', workers=1, queue=0, timeout=0.05)
+        release = threading.Event()
+
+        def block() -> str:
+            release.wait()
+            return 'done'
+
+        assert executor.run(str.upper, 'a') == 'A'
+        try:
+            executor.run(block)  # keeps the worker after timeout
+            assert False
+        except TimeoutError:
+            pass
+        try:
+            executor.run(block)
+            assert False
+        except RejectedException:
+            pass
+        stats = executor.stats()
+        assert stats['running'] == 1 and stats['queued'] == 0
+        assert stats['timeouts'] == 1 and stats['rejected'] == 1
+
+        with open('bot_service/definition/script.def', 'r', encoding='utf8') as f:
+            script = load_script(f)
+        bot = BotModel()
+        assert bot.build_model(script)
+        error = bot.get_settings()['error']
+        configured, ScriptHandler.executor = ScriptHandler.executor, executor
+        try:
+            assert bot.handle_message(1, '理财产品推荐评估')[1] == [error]  # rejected
+            release.set()
+            time.sleep(0.05)
+            assert bot.handle_message(1, '理财产品推荐评估')[1] == ['你适合稳健型的理财产品。']
+        finally:
+            ScriptHandler.executor = configured
+            executor.shutdown()
+        assert executor.stats()['completed'] == 3
+
+    def test_single_flight(self) -> None:
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow(msg: str) -> str:
+            calls.append(msg)
+            release.wait()
+            if msg == 'bad':
+                raise ValueError(msg)
+            return msg.upper()
+
+        results = {}
+
+        def worker(i: int, msg: str) -> None:
+            try:
+                results[i] = flights.do(('slow', msg), slow, msg)
+            except ValueError as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i, ['a', 'bad'][i % 2]))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        while flights.stats()['coalesced'] < 6:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        assert sorted(calls) == ['a', 'bad']
+        assert [results[i] for i in range(0, 8, 2)] == ['A'] * 4
+        assert all(isinstance(results[i], ValueError) for i in range(1, 8, 2))
+        assert flights.stats() == {'in_flight': 0, 'coalesced': 6}
+
+        calls.clear()
+
+        async def slow_async(msg: str) -> str:
+            calls.append(msg)
+            await asyncio.sleep(0.01)
+            return msg.upper()
+
+        async def burst() -> list[str]:
+            return await asyncio.gather(*[
+                flights.do_async(('slow', msg), slow_async, msg)
+                for msg in ['a', 'b', 'a', 'a', 'b']])
+
+        assert asyncio.run(burst()) == ['A', 'B', 'A', 'A', 'B']
+        assert sorted(calls) == ['a', 'b']
+        assert flights.stats() == {'in_flight': 0, 'coalesced': 9}
+
+        calls.clear()
+
+        async def cancel_leader() -> str:
+            leader = asyncio.create_task(flights.do_async(('slow', 'c'), slow_async, 'c'))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.do_async(('slow', 'c'), slow_async, 'c'))
+            await asyncio.sleep(0)
+            leader.cancel()
+            try:
+                await leader
+            except asyncio.CancelledError:
+                pass
+            return await follower
+
+        assert asyncio.run(cancel_leader()) == 'C'
+        assert calls == ['c', 'c']  # called again by the follower
+        assert flights.stats()['in_flight'] == 0
+
+    def test_circuit_breaker(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        thresholds = (CircuitBreaker.threshold, CircuitBreaker.window, CircuitBreaker.cooldown)
+        CircuitBreaker.threshold, CircuitBreaker.window, CircuitBreaker.cooldown = 2, 1, 0.05
+        try:
+            breaker = CircuitBreaker('check')
+            assert breaker.allow()
+            breaker.succeed(('a', ), 'A')
+            breaker.fail()
+            assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+            breaker.fail()
+            assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+            assert breaker.fallback(('a', )) == 'A'
+            try:
+                breaker.fallback(('b', ))
+                assert False
+            except CircuitOpenException:
+                pass
+
+            time.sleep(0.05)
+            assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+            assert not breaker.allow()  # one probe at a time
+            breaker.fail()
+            assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+            time.sleep(0.05)
+            assert breaker.allow()
+            breaker.succeed(('b', ), 'B')
+            assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+            breaker.fail()
+            assert breaker.state == CircuitBreaker.CLOSED  # failures reset
+        finally:
+            CircuitBreaker.threshold, CircuitBreaker.window, CircuitBreaker.cooldown = thresholds
@@ -0,0 +1,153 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import bot_service.service.data.portal as portal
+import bot_service.service.model.loader as loader
+
+
+class TestLoader(unittest.TestCase):
+
+    def test_lazy(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        titles = {os.path.basename(d.path): d.title for d in loader.index.values()}
+        assert titles['script.def'] == '钱庄业务'
+        assert titles['script3.def'] == '淘宝电商'
+        assert all(os.path.isabs(d.path) for d in loader.index.values())
+
+        schema = next(s for s, d in loader.index.items() if d.path.endswith('script3.def'))
+        loader.bots.pop(schema, None)
+        bot = loader.get_bot(schema)
+        assert bot is not None and loader.bots[schema] is bot
+        assert loader.get_bot(schema) is bot  # built once
+        assert bot.get_settings()['title'] == loader.index[schema].title
+        assert loader.get_bot('unknown') is None
+
+        loader.warm_up(['*'])
+        assert set(loader.bots) == set(loader.index)
+
+    def test_reload(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        with open(os.path.join(loader.DEFINITION_DIR, 'script3.def'), 'r', encoding='utf8') as f:
+            source = f.read()
+        saved = (loader.DEFINITION_DIR, loader.index, dict(loader.bots))
+        with tempfile.TemporaryDirectory() as directory:
+            loader.DEFINITION_DIR, loader.index = os.path.realpath(directory), {}
+            loader.bots.clear()
+            try:
+                path = os.path.join(loader.DEFINITION_DIR, 'test_reload.def')
+                with open(path, 'w', encoding='utf8') as f:
+                    f.write(source)
+                loader.scan()
+                schema = next(s for s, d in loader.index.items() if d.path == path)
+                bot = loader.get_bot(schema)
+                assert bot is not None
+
+                with open(path, 'w', encoding='utf8') as f:  # broken
+                    f.write(source + '\n  bad indentation')
+                loader.scan()
+                assert loader.get_bot(schema) is bot  # keeps the previous model
+
+                with open(path, 'w', encoding='utf8') as f:
+                    f.write(source.replace('淘宝电商', '淘宝电商二'))
+                loader.scan()
+                assert loader.get_bot(schema) is not bot
+                assert loader.index[schema].title == '淘宝电商二'
+                assert loader.get_bot(schema).get_settings()['title'] == '淘宝电商二'
+
+                os.remove(path)
+                loader.scan()
+                assert schema not in loader.index and schema not in loader.bots
+            finally:
+                loader.DEFINITION_DIR, loader.index = saved[:2]
+                loader.bots.clear()
+                loader.bots.update(saved[2])
+
+    def test_failed(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        with open(os.path.join(loader.DEFINITION_DIR, 'script3.def'), 'r', encoding='utf8') as f:
+            source = f.read()
+        saved = (loader.DEFINITION_DIR, loader.index, dict(loader.bots))
+        with tempfile.TemporaryDirectory() as directory:
+            loader.DEFINITION_DIR, loader.index = os.path.realpath(directory), {}
+            loader.bots.clear()
+            try:
+                path = os.path.join(loader.DEFINITION_DIR, 'test_failed.def')
+                with open(path, 'w', encoding='utf8') as f:  # broken
+                    f.write(source + '\n  bad indentation')
+                loader.scan()
+                schema = next(s for s, d in loader.index.items() if d.path == path)
+                body, etag = portal.option_response()
+                assert [o['schema'] for o in portal.option()] == [schema]
+
+                version = loader.version
+                assert loader.get_bot(schema) is None
+                assert loader.version > version
+                assert portal.option() == []
+                assert portal.option_response()[1] != etag
+
+                with open(path, 'w', encoding='utf8') as f:  # fixed
+                    f.write(source)
+                os.utime(path, ns=(0, 0))
+                loader.scan()
+                assert [o['schema'] for o in portal.option()] == [schema]
+                assert portal.option_response() == (body, etag)
+                assert loader.get_bot(schema) is not None
+            finally:
+                loader.DEFINITION_DIR, loader.index = saved[:2]
+                loader.version += 1  # the cached options are of the test index
+                loader.bots.clear()
+                loader.bots.update(saved[2])
+
+    def test_symlink(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        with open(os.path.join(loader.DEFINITION_DIR, 'script3.def'), 'r', encoding='utf8') as f:
+            source = f.read()
+        saved = (loader.DEFINITION_DIR, loader.index, dict(loader.bots))
+        with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as outside:
+            loader.DEFINITION_DIR, loader.index = directory, {}
+            loader.bots.clear()
+            try:
+                # a mounted config map: x.def -> ..data/x.def, ..data -> a version
+                for name, title in (('v1', '淘宝电商'), ('v2', '淘宝电商二')):
+                    os.mkdir(os.path.join(outside, name))
+                    with open(os.path.join(outside, name, 'x.def'), 'w', encoding='utf8') as f:
+                        f.write(source.replace('淘宝电商', title))
+                data = os.path.join(directory, '..data')
+                os.symlink(os.path.join(outside, 'v1'), data)
+                path = os.path.join(directory, 'x.def')
+                os.symlink(os.path.join('..data', 'x.def'), path)
+
+                loader.scan()
+                schema = loader.schema_id(path)
+                assert list(loader.index) == [schema] and loader.index[schema].path == path
+                assert loader.get_bot(schema).get_settings()['title'] == '淘宝电商'
+
+                os.remove(data)  # updated
+                os.symlink(os.path.join(outside, 'v2'), data)
+                loader.scan()
+                assert list(loader.index) == [schema]
+                assert loader.get_bot(schema).get_settings()['title'] == '淘宝电商二'
+            finally:
+                loader.DEFINITION_DIR, loader.index = saved[:2]
+                loader.version += 1
+                loader.bots.clear()
+                loader.bots.update(saved[2])
+
+    def test_parallel(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        schemas = list(loader.index)
+        loader.bots.clear()
+        timings = loader.build(schemas, workers=2)
+        assert list(timings) == schemas and set(loader.bots) == set(schemas)
+        for schema in schemas:
+            bot = loader.bots[schema]
+            assert bot.get_settings()['title'] == loader.index[schema].title
+            assert bot.handle_message(0)[1] == loader.get_bot(schema).handle_message(0)[1]
+        assert loader.build(schemas, workers=2) == {}  # built already
@@ -3,7 +3,9 @@ import unittest
 
 import bot_service.service.model.parser as parser
 
+from benchmark.bench_parser import identify_command_pyparsing
 from bot_service.service.model.bot import CommandEnum
+from bot_service.service.model.exception import AnalysisException
 
 
 class TestParser(unittest.TestCase):
@@ -154,3 +156,64 @@ class TestParser(unittest.TestCase):
             services = services[0][1]
             assert len(services) == 1
             assert services[0][0] == (CommandEnum.Service, '5')
+
+    def test_identify(self):
+        cases = {
+            'service "a"': (CommandEnum.Service, 'a'),
+            'service"a"': (CommandEnum.Service, 'a'),
+            'service  "  a b "  ': (CommandEnum.Service, 'a b '),
+            'service "\u3000a"': (CommandEnum.Service, '\u3000a'),
+            'text""""': (CommandEnum.Text, '', ''),
+            'script "a" "b" "c"': (CommandEnum.ScriptWaiting, 'a', 'b', 'c'),
+            'script "a" "b"': (CommandEnum.Script, 'a', 'b'),
+            'script "a" "b" cache 60': (CommandEnum.Script, 'a', 'b', '60', None),
+            'script "a" "b" "c" cache 0.5 10': (CommandEnum.ScriptWaiting, 'a', 'b', 'c', '0.5', '10'),
+            'script "a" "b" cache': None,
+            'script "a" "b" cache 1 x': None,
+            'script "a" "b" cache 60 0': None,
+            'script "a" "b" cache 60 00': None,
+            'faq"x" ': (CommandEnum.FAQ, 'x'),
+            '"a"\t:\t"\tb"': (CommandEnum.KVItem, 'a', 'b'),
+            'settings': (CommandEnum.Setting, ),
+            'services "a"': None,
+            'service "a" "b"': None,
+            'settings ""': None,
+            'text "a""b"x': None,
+            '"a":': None,
+            'SERVICE "a"': None
+        }
+        for s, command in cases.items():
+            assert parser.identify_command(s) == command
+
+        # a tab in a content is expanded to spaces, as the pyparsing grammars did
+        for s in ['service "a\tb"', 'text "x\ty" "\tz"', '"a\tb":"c"', 'faq "ab\tc"\t', 'service\t"a"']:
+            assert parser.identify_command(s) == identify_command_pyparsing(s)
+        assert parser.identify_command('service "a\tb"') == (CommandEnum.Service, 'a      b')
+
+    def test_stream(self):
+        logger = logging.getLogger()
+        logger.disabled = True
+        with open('tests/testcase/complicated.def', 'r', encoding='utf8') as f:
+            expected = parser.load_script(f)
+
+        consumed = []
+        with open('tests/testcase/complicated.def', 'r', encoding='utf8') as f:
+            def lines():
+                for line in f:
+                    consumed.append(line)
+                    yield line
+
+            stream = parser.load_script(lines(), stream=True)
+            first = next(stream)
+            assert first == expected[0]
+            # the settings block is closed by the first service line
+            assert len(consumed) == 16
+            assert [first] + list(stream) == expected
+
+        with open('tests/testcase/incorrect.def', 'r', encoding='utf8') as f:
+            failed = False
+            try:
+                list(parser.load_script(f, stream=True))
+            except AnalysisException:
+                failed = True
+            assert failed
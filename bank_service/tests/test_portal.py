@@ -0,0 +1,50 @@
+import json
+import logging
+import time
+import unittest
+
+import bot_service.controller.portal as portal
+import bot_service.service.model.loader as loader
+import serv_auth.auth as auth
+
+from asgiref.sync import async_to_sync
+from django.http.request import HttpRequest
+
+
+class TestPortal(unittest.TestCase):
+
+    def test_etag(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        token = auth.generateToken(payload={'id': 1, 'exp': int(time.time()) + 60})
+
+        def get(view, etag: str = None, **params):
+            req = HttpRequest()
+            req.method = 'GET'
+            req.META['HTTP_AUTHORIZATION'] = token
+            if etag is not None:
+                req.META['HTTP_IF_NONE_MATCH'] = etag
+            req.GET.update(params)
+            return async_to_sync(view)(req)
+
+        resp = get(portal.option)
+        assert resp.status_code == 200 and resp['ETag'].startswith('"')
+        options = json.loads(resp.content)['data']
+        assert [o['schema'] for o in options] == list(loader.index)
+        assert all(o['schema'] == loader.schema_id(loader.index[o['schema']].path) for o in options)
+        assert get(portal.option)['ETag'] == resp['ETag']
+        assert get(portal.option, resp['ETag']).status_code == 304
+        assert get(portal.option, 'W/"x", ' + resp['ETag']).status_code == 304
+        assert get(portal.option, '"x"').status_code == 200
+
+        schema = options[0]['schema']
+        resp = get(portal.detail, schema=schema)
+        assert json.loads(resp.content)['data'] == loader.get_bot(schema).get_settings()
+        assert get(portal.detail, resp['ETag'], schema=schema).status_code == 304
+        assert get(portal.detail, resp['ETag'], schema=options[1]['schema']).status_code == 200
+
+        req = HttpRequest()  # the detail api by POST
+        req.method = 'POST'
+        req.META['HTTP_AUTHORIZATION'] = token
+        req._body = json.dumps({'schema': schema}).encode()
+        assert async_to_sync(portal.detail)(req).content == resp.content
@@ -0,0 +1,302 @@
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import bot_service.backends.shm as shm
+import bot_service.controller.session as controller
+import bot_service.service.data.session as data
+import bot_service.service.model.loader as loader
+import bot_service.service.model.parser as parser
+import serv_auth.auth as auth
+
+from bot_service.backends.memory import MemoryStore, SessionStore
+from bot_service.backends.shm import SharedStore
+from bot_service.middleware import SessionMiddleware
+from bot_service.service.model.bot import BotModel
+from bot_service.service.util.lock import StripedLock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse
+
+
+class TestSession(unittest.TestCase):
+
+    def test_memory(self) -> None:
+        store = MemoryStore(max_entries=2, sweep_interval=60)
+        assert store.set('a', {'status': 0}, 60, must_create=True)
+        assert not store.set('a', {}, 60, must_create=True)
+        assert not store.set('b', {}, 60)  # not existed
+        assert store.set('b', {'status': 1}, 0.05, must_create=True)
+        data = store.get('a', 60)  # a is used after b
+        data['status'] = 2
+        assert store.get('a', 60) == {'status': 0}  # a copy
+        assert store.set('c', {}, 60, must_create=True)
+        assert store.get('b', 60) is None and len(store) == 2  # least recently used
+
+        assert store.set('d', {}, 0.01, must_create=True)
+        assert store.set('e', {}, 0.01, must_create=True)
+        time.sleep(0.02)
+        assert store.sweep() == 2 and len(store) == 0
+
+        session = SessionStore()
+        session['schema'] = 'x'
+        session['status'] = 3
+        session.save()
+        key = session.session_key
+        assert SessionStore(key).load() == {'schema': 'x', 'status': 3}
+        assert session.exists(key) and not session.exists('unknown')
+        session.delete()
+        assert SessionStore(key).load() == {}
+        try:
+            session.save()  # deleted by another request
+            assert False
+        except UpdateError:
+            pass
+
+    def test_shm(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sessions')
+            store = SharedStore(path, buckets=1, bucket_size=2, stripes=1)
+            assert store.set('a', {'schema': 'x', 'status': 0}, 60, must_create=True)
+            assert not store.set('a', {}, 60, must_create=True)
+            assert not store.set('b', {}, 60)  # not existed
+            assert store.set('b', {'status': 1}, 30, must_create=True)
+            assert store.set('c', {'status': 2}, 60, must_create=True)  # b expires first
+            assert store.get('b', 60) is None and store.get('a', 60) == {'schema': 'x', 'status': 0}
+
+            other = SharedStore(path, buckets=1, bucket_size=2, stripes=1)  # another worker
+            assert other.get('c', 60) == {'status': 2}
+            other.delete('c')
+            assert store.get('c', 60) is None
+            assert store.set('d', {}, 0.01, must_create=True)
+            time.sleep(0.02)
+            assert store.sweep() == 1 and other.get('a', 60) is not None
+            try:
+                store.set('a', {'data': 'x' * shm.DATA_SIZE}, 60)
+                assert False
+            except ValueError:
+                pass
+            assert SharedStore(path, buckets=2).get('a', 60) is None  # of another layout
+
+            # a session locked by another worker process
+            store = SharedStore(path, stripes=4)
+            context = multiprocessing.get_context('fork')
+            held, done = context.Event(), context.Event()
+
+            def worker() -> None:
+                with SharedStore(path, stripes=4).hold('a'):
+                    held.set()
+                    time.sleep(0.2)
+                    done.set()  # just before released
+
+            process = context.Process(target=worker)
+            process.start()
+            try:
+                assert held.wait(5)
+                with store.hold('a'):
+                    assert done.is_set()
+
+                async def hold() -> bool:
+                    async with store.hold_async('a'):
+                        return True
+
+                assert asyncio.run(hold())
+            finally:
+                process.join()
+
+    def test_lock(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        locks = StripedLock(64)
+        assert locks.get('a') is locks.get('a')
+        counts = dict.fromkeys(range(16), 0)
+
+        def count(key: int) -> None:
+            for _ in range(200):
+                with locks.hold(key % 16):
+                    value = counts[key % 16]
+                    time.sleep(0)  # let the others in
+                    counts[key % 16] = value + 1
+
+        threads = [threading.Thread(target=count, args=(i, )) for i in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(v == 400 for v in counts.values()) and locks.stats()['acquired'] == 6400
+
+        # the messages of a session at once, each loading the stat saved by the previous
+        schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+        session = SessionStore()
+        data.init(session, {'schema': schema})
+        key = session.session_key
+        bot = loader.get_bot(schema)
+        stat = 0
+        for _ in range(8):
+            stat, _ = bot.handle_message(stat, 'Bank service')
+
+        def send() -> None:
+            data.message(SessionStore(key), {'content': 'Bank service'})
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert SessionStore(key).load()['status'] == stat
+
+        # the sessions of different users rarely share a lock
+        sessions = []
+        for _ in range(8):
+            session = SessionStore()
+            data.init(session, {'schema': schema})
+            sessions.append(session.session_key)
+        before = data.session_locks.stats()
+
+        def chat(key: str) -> None:
+            for _ in range(200):
+                data.message(SessionStore(key), {'content': 'Bank service'})
+
+        threads = [threading.Thread(target=chat, args=(key, )) for key in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        after = data.session_locks.stats()
+        assert after['acquired'] - before['acquired'] == 1600
+        assert after['contended'] - before['contended'] < 160
+
+    def test_lock_async(self) -> None:
+        locks = StripedLock(4)
+        counts = {'k': 0}
+
+        async def count() -> None:
+            async with locks.hold_async('k'):
+                value = counts['k']
+                await asyncio.to_thread(time.sleep, 0.001)  # the holder needs the executor
+                counts['k'] = value + 1
+
+        async def run() -> None:
+            # many more waiters than the threads of the default executor
+            await asyncio.wait_for(asyncio.gather(*[count() for _ in range(64)]), 10)
+            with locks.hold('k'):  # held by a thread
+                waiter = asyncio.ensure_future(count())
+                await asyncio.sleep(0.01)
+                waiter.cancel()
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    pass
+            await asyncio.wait_for(count(), 1)  # not held by the cancelled waiter
+
+        asyncio.run(run())
+        assert counts['k'] == 65 and locks.stats()['contended'] >= 63
+
+    def test_cookie(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+        session = SessionStore()
+        data.init(session, {'schema': schema})
+        key = session.session_key
+
+        req = HttpRequest()
+        req.session = SessionStore(key)
+        data.message(req.session, {'content': 'Bank service'})
+        other = SessionStore(key)  # the next message, saved after the lock
+        other['status'] = 0
+        other.save()
+        resp = SessionMiddleware(lambda r: HttpResponse()).process_response(req, HttpResponse())
+        assert resp.cookies[settings.SESSION_COOKIE_NAME].value == key  # refreshed
+        assert resp.cookies[settings.SESSION_COOKIE_NAME]['max-age'] == settings.SESSION_COOKIE_AGE
+        assert SessionStore(key).load()['status'] == 0  # not saved again
+
+    def test_restore(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        path = os.path.join(loader.DEFINITION_DIR, 'script2.def')
+        schema = loader.schema_id(path)
+        session = SessionStore()
+        data.init(session, {'schema': schema})
+        data.message(session, {'content': 'Basic financial service'})
+        key = session.session_key
+
+        # the definition edited, and built by another worker (no history)
+        with open(path, 'r', encoding='utf8') as f:
+            source = f.read().replace('service "Bank service"', 'service "New"\n\nservice "Bank service"')
+        edited = BotModel()
+        assert edited.build_model(parser.load_script(io.StringIO(source)))
+        old = loader.bots[schema]
+        stat = edited.find_stat(old.get_stat_key(session['status']))
+        assert stat is not None and stat != session['status']
+        loader.bots[schema] = edited
+        try:
+            reps = data.message(SessionStore(key), {'content': 'Production'})
+            assert [r['content'] for r in reps] == edited.handle_message(stat, 'Production')[1]
+            assert SessionStore(key).load()['revision'] == edited.get_revision()
+        finally:
+            loader.bots[schema] = old
+
+    def test_messages(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+        contents = ['Bank service', 'Production', 'unknown', 'Basic financial service']
+
+        single = SessionStore()
+        data.init(single, {'schema': schema})
+        replies = [[r['content'] for r in data.message(single, {'content': c})] for c in contents]
+
+        batch = SessionStore()
+        data.init(batch, {'schema': schema})
+        resp = data.messages(batch, {'contents': contents})
+        assert [[r['content'] for r in reps] for reps in resp] == replies
+        assert batch['status'] == single['status']
+        assert SessionStore(batch.session_key).load()['status'] == single['status']
+        assert data.messages(batch, {'contents': []}) == []
+
+    def test_async(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+        contents = ['Bank service', 'Production', 'unknown']
+        token = auth.generateToken(payload={'id': 1, 'exp': int(time.time()) + 60})
+        session = SessionStore()
+
+        def post(view, body: dict, token: str = token) -> dict:
+            req = HttpRequest()
+            req.method = 'POST'
+            req.META['HTTP_AUTHORIZATION'] = token
+            req._body = json.dumps(body).encode()
+            req.session = session
+            resp = async_to_sync(view)(req)
+            assert asyncio.iscoroutinefunction(view)
+            return json.loads(resp.content)
+
+        assert post(controller.message, {'content': 'x'}, 'bad token')['code'] == 50008
+        resp = post(controller.init, {'schema': schema})
+        assert resp['code'] == 0
+        replies = [post(controller.message, {'content': c})['data'] for c in contents]
+        stat = session['status']
+        batch = post(controller.messages, {'contents': contents})['data']
+        post(controller.init, {'schema': schema})
+
+        # the same as the sync path
+        other = SessionStore()
+        assert [r['content'] for r in data.init(other, {'schema': schema})] == \
+            [r['content'] for r in resp['data']]
+        assert [[r['content'] for r in data.message(other, {'content': c})] for c in contents] == \
+            [[r['content'] for r in reps] for reps in replies]
+        assert other['status'] == stat
+        assert [[r['content'] for r in reps] for reps in batch] == \
+            [[r['content'] for r in reps] for reps in data.messages(other, {'contents': contents})]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import unittest
+
+import bot_service.controller.websocket as websocket
+import bot_service.service.data.session as data
+import bot_service.service.model.loader as loader
+import serv_auth.auth as auth
+
+from bot_service.backends.memory import SessionStore
+
+
+class TestWebsocket(unittest.TestCase):
+
+    def test_chat(self) -> None:
+        logger = logging.getLogger()
+        logger.disabled = True
+        schema = loader.schema_id(os.path.join(loader.DEFINITION_DIR, 'script2.def'))
+        contents = ['Bank service', 'Production', 'unknown', 'Basic financial service']
+        token = auth.generateToken(payload={'id': 1, 'exp': int(time.time()) + 60})
+
+        async def connect(query: str, frames: list[str]) -> list:
+            events = [{'type': 'websocket.connect'}]
+            events += [{'type': 'websocket.receive', 'text': f} for f in frames]
+            events.append({'type': 'websocket.disconnect', 'code': 1000})
+            sent = []
+
+            async def receive() -> dict:
+                return events.pop(0)
+
+            async def send(event: dict) -> None:
+                sent.append(event)
+
+            scope = {'type': 'websocket', 'path': '/api/bot/chat/socket',
+                     'query_string': query.encode(), 'headers': []}
+            await websocket.chat(scope, receive, send)
+            return sent
+
+        sent = asyncio.run(connect('', []))
+        assert json.loads(sent[1]['text'])['code'] == 50008 and sent[2]['code'] == 1008
+        sent = asyncio.run(connect('token=broken', []))
+        assert json.loads(sent[1]['text'])['code'] == 50008
+
+        frames = [json.dumps({'content': 'Bank service'}), json.dumps({'schema': schema})]
+        frames += [json.dumps({'content': c}) for c in contents] + ['{}']
+        sent = asyncio.run(connect('token=' + token, frames))
+        assert sent[0]['type'] == 'websocket.accept'
+        resps = [json.loads(event['text']) for event in sent[1:]]
+        assert resps[0]['code'] == 1 and resps[-1]['code'] == 1  # not init, bad frame
+
+        # the same replies as the http api
+        session = SessionStore()
+        welcome = data.init(session, {'schema': schema})
+        replies = [data.message(session, {'content': c}) for c in contents]
+        assert [r['content'] for r in resps[1]['data']] == [r['content'] for r in welcome]
+        assert [[r['content'] for r in resp['data']] for resp in resps[2:-1]] == \
+            [[r['content'] for r in reps] for reps in replies]